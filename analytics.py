@@ -0,0 +1,77 @@
+'''Reports game counts, score distributions, percentile ranks and active players per region and topic from the score records, in a single streaming pass over the games. Usage: python analytics.py [--db scores.db] [--days N] [--active-days 30]'''
+import os
+import time
+import argparse
+from main import Game
+from modules.scores import ScoreStore, categories_key
+from modules.analytics import ScoreAnalytics, DAY
+
+BAR_WIDTH = 40
+# categories key in the score records -> topic name shown to players
+TOPIC_NAMES = {categories_key(categories): topic for topic, categories in Game.QUESTION_FORMATS.items()}
+
+
+def group_name(region, categories):
+    # groups over every topic are named apart from the 'All Topics' topic
+    topic = "every topic" if categories is None else TOPIC_NAMES.get(categories, categories)
+    return f"{region or 'Every region'} / {topic}"
+
+
+def date(timestamp):
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def group_report(analytics, key):
+    '''Returns the report lines for one group of games.'''
+    stats = analytics.groups[key]
+    lines = [f"{group_name(*key)}: {stats.games} games by about {stats.users.count()} players, "
+             f"{stats.active_users.count()} active in the last {analytics.active_days:g} days"]
+    if stats.first_played is not None:
+        lines.append(f"  played from {date(stats.first_played)} to {date(stats.last_played)}")
+    lines.append(f"  scores: mean {stats.mean():.2f}, 25th percentile {stats.percentile(0.25)}, "
+                 f"median {stats.percentile(0.5)}, 75th {stats.percentile(0.75)}, 90th {stats.percentile(0.9)}")
+    lines.append("  score    games  percentile rank")
+    most = max(stats.histogram.values())
+    for score, games, rank in stats.percentile_ranks():
+        bar = "#" * max(1, round(BAR_WIDTH * games / most))
+        lines.append(f"  {score:5} {games:8} {rank:16.1f}  {bar}")
+    return lines
+
+
+def report(analytics):
+    '''Returns the whole report: every game, then each region, each topic and each region and topic played.'''
+    keys = sorted(analytics.groups, key=lambda key: (key[0] is not None, key[1] is not None, key[0] or "", key[1] or ""))
+    lines = []
+    for key in keys:
+        lines.extend(group_report(analytics, key))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report statistics of the recorded games.")
+    parser.add_argument("--db", default=ScoreStore.PATH, help=f"score database (default {ScoreStore.PATH})")
+    parser.add_argument("--days", type=float, default=None,
+                        help="only include games from the last N days (default: all games)")
+    parser.add_argument("--active-days", type=float, default=ScoreAnalytics.ACTIVE_DAYS,
+                        help=f"players who played in the last N days count as active (default {ScoreAnalytics.ACTIVE_DAYS})")
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist")
+    # a report never changes the database, so it is opened read-only
+    store = ScoreStore(args.db, read_only=True)
+    now = time.time()
+    since = now - args.days * DAY if args.days is not None else None
+    start = time.perf_counter()
+    analytics = ScoreAnalytics(args.active_days, now).add_games(store.iter_games(since))
+    elapsed = time.perf_counter() - start
+    store.close()
+    if not analytics.groups:
+        print("No games have been recorded yet.")
+        return
+    print(report(analytics))
+    print(f"Read {analytics.groups[(None, None)].games} games in {elapsed:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+'''Measures the streaming analytics pass over score histories of growing size, checking that its memory stays flat as the number of games grows and that the player counts are close to exact. Run from the project folder with: python -m benchmarks.analytics'''
+import os
+import time
+import random
+import tempfile
+import tracemalloc
+from main import Game
+from modules.scores import ScoreStore, categories_key
+from modules.analytics import ScoreAnalytics, DAY
+
+SIZES = (10000, 100000, 1000000)
+PLAYERS = 20000
+YEARS = 3
+
+
+def fill(store, games, rng, now):
+    '''Inserts games straight into the games table, each by one of PLAYERS players at a random time in the last YEARS years, in batches of 10,000.'''
+    regions = ("World", "Africa", "Americas", "Asia & Middle East", "Europe", "Oceania")
+    topics = [categories_key(categories) for categories in Game.QUESTION_FORMATS.values()]
+    batch = []
+    for _ in range(games):
+        batch.append((f"player{rng.randrange(PLAYERS)}", rng.choice(regions), rng.choice(topics),
+                      min(Game.QUESTION_LIMIT, int(rng.betavariate(4, 3) * 11)), now - rng.random() * YEARS * 365 * DAY))
+        if len(batch) == 10000:
+            with store.transaction():
+                store.connection.executemany(
+                    "INSERT INTO games (username, region, categories, score, played_at) VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        with store.transaction():
+            store.connection.executemany(
+                "INSERT INTO games (username, region, categories, score, played_at) VALUES (?, ?, ?, ?, ?)", batch)
+
+
+def main():
+    rng = random.Random(1)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as folder:
+        store = ScoreStore(os.path.join(folder, "scores.db"))
+        recorded = 0
+        for size in SIZES:
+            # games are only inserted, leaderboards aren't needed for analytics
+            fill(store, size - recorded, rng, now)
+            recorded = size
+            tracemalloc.start()
+            start = time.perf_counter()
+            analytics = ScoreAnalytics(now=now).add_games(store.iter_games())
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            players, active = store.connection.execute(
+                "SELECT COUNT(DISTINCT username), COUNT(DISTINCT CASE WHEN played_at >= ? THEN username END) FROM games",
+                (analytics.active_since,)).fetchone()
+            overall = analytics.groups[(None, None)]
+            print(f"{size:8} games: {size / elapsed:8.0f} games/sec traced, peak {peak / 1024:6.0f} KiB, "
+                  f"{len(analytics.groups)} groups, players {overall.users.count()} (exact {players}), "
+                  f"active {overall.active_users.count()} (exact {active})")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
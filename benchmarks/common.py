@@ -0,0 +1,18 @@
+import os
+import contextlib
+from main import Game
+
+
+class BenchmarkGame(Game):
+    '''A TESTING game, which answers its own questions at random so benchmarks can play it unattended.'''
+    TESTING = True
+
+
+def play_games(games):
+    '''Plays each game of an iterable to the end and shows its final report, printing nothing, and yields the game once it is played. A game the data runs out of questions for ends early and gets no report, see Game.game_over. Output stays discarded until the last game is yielded.'''
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for game in games:
+            game.play()
+            if game.game_over():
+                game.final_report()
+            yield game
@@ -0,0 +1,74 @@
+'''Compares the memory use and lookup speed of CompactData with the nested dictionaries of Data. Memory is measured once questions have been generated for every region, so it includes the question indexes built from each layout. Run from the project folder with: python -m benchmarks.compact'''
+import gc
+import time
+import random
+import tracemalloc
+from modules.data import Data
+from modules.compact import CompactData
+from modules.question import generate_questions
+
+LOOKUPS = 100000
+REGIONS = ("World",) + tuple(Data.REGIONS)
+
+
+def traced_size(build):
+    '''Returns the object built by build and the bytes of memory still allocated for it afterwards.'''
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def time_lookups(mapping, keys, rng):
+    '''Returns nanoseconds per lookup of random keys in mapping.'''
+    sample = [rng.choice(keys) for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for key in sample:
+        mapping[key]
+    return (time.perf_counter() - start) / LOOKUPS * 1e9
+
+
+def time_generation(data, count=5000):
+    start = time.perf_counter()
+    for _ in generate_questions(data, "World", ("capital", "languages", "dishes"), count, seed=1):
+        pass
+    return count / (time.perf_counter() - start)
+
+
+def build_indexes(data):
+    '''Generates questions for every region, so the question indexes are built, and returns data.'''
+    for region in REGIONS:
+        for _ in generate_questions(data, region, ("capital", "languages", "dishes"), 200, seed=1):
+            pass
+    return data
+
+
+def main():
+    def load_data():
+        # JSON parsing gives every repeated string its own object, which is what a worker holds after a cold start
+        data = Data(use_snapshot=False, preload=Data.RAW_TOPICS)
+        data.raw_data = {}
+        return build_indexes(data)
+    data, data_size = traced_size(load_data)
+    compact, compact_size = traced_size(lambda: build_indexes(CompactData.from_data(data)))
+    print(f"{'Data and indexes':32} {data_size / 1024:10.1f} KiB")
+    print(f"{'CompactData and indexes':32} {compact_size / 1024:10.1f} KiB ({compact_size / data_size * 100:.0f}%)\n")
+
+    rng = random.Random(1)
+    print(f"{'lookup':32} {'Data ns':>10} {'Compact ns':>12}")
+    for category in Data.QUESTION_TOPICS:
+        countries = list(data.items[category])
+        items = [item for item in data.countries[category] if type(item) == str]
+        print(f"{'items[' + category + '][country]':32} {time_lookups(data.items[category], countries, rng):10.0f} "
+              f"{time_lookups(compact.items[category], countries, rng):12.0f}")
+        print(f"{'countries[' + category + '][item]':32} {time_lookups(data.countries[category], items, rng):10.0f} "
+              f"{time_lookups(compact.countries[category], items, rng):12.0f}")
+    print(f"\n{'questions/sec':32} {time_generation(data):10.0f} {time_generation(compact):12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+'''Simulates complete TESTING games for every region and topic, and reports questions per second, Question.__init__ latency and peak memory. Results can be saved as JSON and compared with an earlier run to spot regressions. Run from the project folder with:
+python -m benchmarks.games [--games N] [--output results.json] [--compare baseline.json]'''
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tracemalloc
+from main import Game
+from modules.data import Data
+from modules.question import Question
+from modules.stats import STATS
+from benchmarks.common import BenchmarkGame, play_games
+
+
+class TimedGame(BenchmarkGame):
+    '''A TESTING game that times the construction of each question.'''
+
+    def __init__(self, data, region, categories, timings) -> None:
+        super().__init__(data)
+        self.TEST_VALUES = ("Benchmark", region, categories)
+        self.timings = timings
+
+    def next_question(self):
+        start = time.perf_counter()
+        question = Question(self)
+        self.timings.append(time.perf_counter() - start)
+        return question
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_combination(data, region, categories, games):
+    '''Plays games complete games for one region and topic, returning a dictionary of results.'''
+    timings = []
+
+    def new_games():
+        for _ in range(games):
+            game = TimedGame(data, region, categories, timings)
+            game.start_game()
+            yield game
+    start = time.perf_counter()
+    # a game the data runs out of questions for ends early
+    failed = sum(not game.game_over() for game in play_games(new_games()))
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    return {
+        'games': games,
+        'failed_games': failed,
+        'questions': len(timings),
+        'questions_per_sec': len(timings) / elapsed if elapsed else 0,
+        'init_p50_us': percentile(timings, 0.50) * 1e6 if timings else None,
+        'init_p99_us': percentile(timings, 0.99) * 1e6 if timings else None,
+    }
+
+
+def peak_memory(data, games):
+    '''Returns the peak traced Python allocations in KiB while playing games World games. Tracing slows everything down, so this is measured apart from the timings.'''
+    tracemalloc.start()
+    run_combination(data, "World", Game.QUESTION_FORMATS['All Topics'], games)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def run(games):
+    data = Data()
+    results = {
+        'python': platform.python_version(),
+        'games_per_combination': games,
+        'combinations': {}
+    }
+    total_questions = 0
+    total_time = 0
+    all_timings = []
+    for region in data.countries['major region']:
+        for topic, categories in Game.QUESTION_FORMATS.items():
+            result = run_combination(data, region, categories, games)
+            results['combinations'][f"{region} / {topic}"] = result
+            total_questions += result['questions']
+            if result['questions']:
+                total_time += result['questions'] / result['questions_per_sec']
+                all_timings.append(result['init_p99_us'])
+    results['questions_per_sec'] = total_questions / total_time if total_time else 0
+    results['worst_init_p99_us'] = max(all_timings) if all_timings else None
+    results['peak_traced_kib'] = peak_memory(data, max(1, games // 10))
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results['max_rss_kib'] = maxrss / 1024 if sys.platform == "darwin" else maxrss
+    return results
+
+
+def print_results(results, baseline=None):
+    print(f"{'region / topic':40} {'q/sec':>10} {'p50 us':>8} {'p99 us':>8} {'failed':>7}")
+    for name, result in results['combinations'].items():
+        p50 = result['init_p50_us'] or 0
+        p99 = result['init_p99_us'] or 0
+        line = f"{name:40} {result['questions_per_sec']:10.0f} {p50:8.1f} {p99:8.1f} {result['failed_games']:7}"
+        if baseline and name in baseline['combinations']:
+            before = baseline['combinations'][name]['questions_per_sec']
+            if before:
+                line += f"   {(result['questions_per_sec'] / before - 1) * 100:+6.1f}% q/sec"
+        print(line)
+    print(f"\noverall questions/sec: {results['questions_per_sec']:.0f}")
+    print(f"worst p99 Question.__init__: {results['worst_init_p99_us'] or 0:.1f} us")
+    print(f"peak traced memory: {results['peak_traced_kib']:.0f} KiB, max RSS: {results['max_rss_kib']:.0f} KiB")
+    if baseline:
+        print(f"baseline questions/sec: {baseline['questions_per_sec']:.0f}, "
+              f"peak traced memory: {baseline['peak_traced_kib']:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark complete simulated games.")
+    parser.add_argument("--games", type=int, default=200,
+                        help="games per region and topic (default 200)")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--stats", action="store_true",
+                        help="also collect generation retries and stage timings (adds overhead)")
+    args = parser.parse_args()
+    if args.stats:
+        STATS.enable()
+    results = run(args.games)
+    if args.stats:
+        results['generation_stats'] = STATS.snapshot()
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.stats:
+        print(f"\n{'region / category':32} {'retries/q':>10} " + " ".join(f"{stage + ' us':>15}" for stage in STATS.STAGES))
+        for name, entry in results['generation_stats'].items():
+            stages = " ".join(f"{entry['stage_us_per_question'][stage]:15.1f}" for stage in STATS.STAGES)
+            print(f"{name:32} {entry['retries_per_question']:10.1f} {stages}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
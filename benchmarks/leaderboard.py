@@ -0,0 +1,63 @@
+'''Fills a score database with many games and measures leaderboard query latency. Run from the project folder with: python -m benchmarks.leaderboard [games]'''
+import os
+import sys
+import time
+import random
+import tempfile
+import statistics
+from modules.scores import ScoreStore
+
+REGIONS = ("World", "Africa", "Americas", "Asia & Middle East", "Oceania", "Europe")
+CATEGORIES = (("capital", "languages", "dishes"), "capital", "languages", "dishes")
+USERS = 20000
+QUERIES = 2000
+
+
+def fill(store, games, rng):
+    '''Adds games random games in batches, returning the insert rate.'''
+    start = time.perf_counter()
+    batch = []
+    for number in range(games):
+        batch.append((f"user{rng.randrange(USERS)}", rng.choice(REGIONS), rng.choice(CATEGORIES),
+                      rng.randint(0, 10), number))
+        if len(batch) == 5000:
+            store.add_games(batch)
+            batch = []
+    store.add_games(batch)
+    return games / (time.perf_counter() - start)
+
+
+def time_query(query, rng):
+    '''Returns the median and 99th percentile latency of query in microseconds.'''
+    timings = []
+    for _ in range(QUERIES):
+        args = (f"user{rng.randrange(USERS)}", rng.choice(REGIONS), rng.choice(CATEGORIES))
+        start = time.perf_counter()
+        query(*args)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return (statistics.median(timings), timings[int(len(timings) * 0.99)])
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as folder:
+        store = ScoreStore(os.path.join(folder, "scores.db"))
+        rate = fill(store, games, rng)
+        print(f"inserted {games} games at {rate:.0f} games/sec\n")
+        queries = {
+            'top 10 players': lambda username, region, categories: store.top_players(region, categories, 10),
+            'user rank': store.user_rank,
+            'personal best': store.personal_best,
+            'user history': store.user_history,
+        }
+        print(f"{'query':16} {'p50 us':>8} {'p99 us':>8}")
+        for name, query in queries.items():
+            p50, p99 = time_query(query, rng)
+            print(f"{name:16} {p50:8.1f} {p99:8.1f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
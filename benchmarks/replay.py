@@ -0,0 +1,98 @@
+'''Records games answered by simulated players, some of them on a thread pool sharing one copy of the data, then replays every game from its seed and answers and checks that it asks exactly the same questions. Also compares games generated one after another with the same games generated in parallel. Exits with status 1 if any game differs. Run from the project folder with: python -m benchmarks.replay [--games N] [--threads N]'''
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from main import Game
+from modules.data import Data
+
+SETTINGS = (
+    ("World", ('capital', 'languages', 'dishes')),
+    ("Europe", 'capital'),
+    ("Asia & Middle East", 'languages'),
+    ("Africa", 'dishes')
+)
+
+
+def transcript(game, questions):
+    '''Returns what a game asked and what was answered, in a form that compares equal for identical games.'''
+    return [(q.number, q.format, q.answer_pair['country'], q.answer_pair['item'], tuple(q.get_choices().items()),
+             q.correct_choice, q.user_text if game.free_text else q.user_choice, q.answered_correctly)
+            for q in questions]
+
+
+def new_game(data, seed, settings):
+    region, categories, free_text = settings
+    game = Game(data, seed)
+    game.username, game.region, game.categories, game.free_text = f"player{seed}", region, categories, free_text
+    return game
+
+
+def record(data, seed):
+    '''Plays a game with seed, answered by a player with their own generator, the way a user answers from outside the game. Returns the seed, settings, answers and transcript a replay needs.'''
+    player = random.Random(seed)
+    region, categories = player.choice(SETTINGS)
+    settings = (region, categories, player.random() < 0.5)
+    game = new_game(data, seed, settings)
+    answers = []
+    questions = []
+    while not game.game_over():
+        question = game.next_question()
+        questions.append(question)
+        if game.free_text:
+            answers.append(player.choice(list(question.get_choices().values())))
+            question.answer_text(answers[-1])
+        else:
+            answers.append(player.choice(game.LETTERS))
+            question.answer(answers[-1])
+        game.record_answer(question)
+    return seed, settings, answers, transcript(game, questions)
+
+
+def replay(data, recorded):
+    seed, settings, answers, expected = recorded
+    game = new_game(data, seed, settings)
+    return transcript(game, game.replay(answers)) == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that recorded games replay exactly, including games generated in parallel.")
+    parser.add_argument("--games", type=int, default=2000, help="games to record (default 2000)")
+    parser.add_argument("--threads", type=int, default=8, help="threads to record games on in parallel (default 8)")
+    args = parser.parse_args()
+    seeds = range(args.games)
+
+    # each run starts from fresh data, so the threads also race to build the same indexes
+    data = Data()
+    start = time.perf_counter()
+    sequential = [record(data, seed) for seed in seeds]
+    elapsed = time.perf_counter() - start
+    print(f"recorded {args.games} games one after another in {elapsed:.3f} s, {args.games / elapsed:.0f} games/sec")
+
+    data = Data()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        parallel = list(pool.map(lambda seed: record(data, seed), seeds))
+    elapsed = time.perf_counter() - start
+    print(f"recorded {args.games} games on {args.threads} threads in {elapsed:.3f} s, {args.games / elapsed:.0f} games/sec")
+
+    failures = 0
+    differing = sum(1 for one, other in zip(sequential, parallel) if one != other)
+    if differing:
+        print(f"{differing} games generated in parallel differ from the same games generated one after another")
+        failures += differing
+    with ThreadPoolExecutor(args.threads) as pool:
+        replayed = list(pool.map(lambda recorded: replay(data, recorded), parallel))
+    mismatched = replayed.count(False)
+    if mismatched:
+        print(f"{mismatched} of {args.games} games did not replay exactly")
+        failures += mismatched
+    else:
+        print(f"all {args.games} games replayed exactly from their seeds and answers")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
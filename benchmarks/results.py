@@ -0,0 +1,71 @@
+'''Measures the memory that finished games hold on to, per 10,000 games, comparing games that keep a compact Result per answer with games that keep every answered Question as they used to. Also counts the objects left in reference cycles once the games are dropped, which only the cycle collector can free. Run from the project folder with: python -m benchmarks.results [--games N]'''
+import gc
+import time
+import argparse
+import tracemalloc
+from modules.data import Data
+from benchmarks.common import BenchmarkGame, play_games
+
+PER = 10000
+
+
+class QuestionKeepingGame(BenchmarkGame):
+    '''Keeps each answered Question and its Feedback, with the statements the report renders, as games did before answers were recorded as Results.'''
+
+    def __init__(self, data, seed=None):
+        super().__init__(data, seed)
+        self.questions = []
+
+    def record_answer(self, question):
+        super().record_answer(question)
+        feedback = question.kept_feedback = question.feedback
+        feedback.looking_for, feedback.correct_items_statement, feedback.you_said
+        self.questions.append(question)
+
+
+def play(data, game_class, games):
+    '''Plays games of game_class to the end, reports included, and returns them.'''
+    def new_games():
+        for number in range(games):
+            game = game_class(data, number)
+            game.username, game.region, game.categories = game.TEST_VALUES
+            yield game
+    return list(play_games(new_games()))
+
+
+def measure(data, game_class, games):
+    '''Returns the seconds taken to play games, the KiB they still hold once played, and the objects the cycle collector finds once they are dropped.'''
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        play(data, game_class, games)
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        tracemalloc.start()
+        finished = play(data, game_class, games)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del finished
+        cyclic = gc.collect()
+    finally:
+        gc.enable()
+    return elapsed, retained / 1024, cyclic
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory finished games keep.")
+    parser.add_argument("--games", type=int, default=PER, help=f"games to play (default {PER})")
+    args = parser.parse_args()
+    data = Data()
+    # build the shared indexes first, so they aren't counted as memory held by the games
+    play(data, BenchmarkGame, 10)
+    scale = PER / args.games
+    for name, game_class in (("questions kept", QuestionKeepingGame), ("results kept", BenchmarkGame)):
+        elapsed, retained, cyclic = measure(data, game_class, args.games)
+        print(f"{name:15} {args.games / elapsed:6.0f} games/sec, {retained * scale:9.0f} KiB held and "
+              f"{cyclic * scale:8.0f} objects left in cycles per {PER} games")
+
+
+if __name__ == "__main__":
+    main()
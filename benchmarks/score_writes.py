@@ -0,0 +1,49 @@
+'''Measures score write throughput with N processes recording games into the same database at once, and checks that no records are lost. Run from the project folder with: python -m benchmarks.score_writes'''
+import os
+import time
+import tempfile
+import multiprocessing
+from modules.scores import ScoreStore
+
+GAMES_PER_WRITER = 500
+WRITER_COUNTS = (1, 2, 4, 8)
+
+
+def write_games(path, writer, count, start_event):
+    store = ScoreStore(path)
+    start_event.wait()
+    for number in range(count):
+        store.add_game(f"writer{writer}", "World", ("capital", "languages", "dishes"), number % 11)
+    store.close()
+
+
+def run(writers, count=GAMES_PER_WRITER):
+    '''Returns (games per second, games lost) for writers processes each recording count games.'''
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "scores.db")
+        ScoreStore(path).close()
+        start_event = multiprocessing.Event()
+        processes = [multiprocessing.Process(target=write_games, args=(path, writer, count, start_event))
+                     for writer in range(writers)]
+        for process in processes:
+            process.start()
+        start = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        store = ScoreStore(path)
+        (stored,) = store.connection.execute("SELECT COUNT(*) FROM games").fetchone()
+        store.close()
+    return (writers * count / elapsed, writers * count - stored)
+
+
+def main():
+    print(f"{'writers':>8} {'games/sec':>12} {'lost':>6}")
+    for writers in WRITER_COUNTS:
+        rate, lost = run(writers)
+        print(f"{writers:>8} {rate:>12.0f} {lost:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+'''Load test for server.py: starts a game server in this process and connects many automatic clients at once, each playing complete games. Run from the project folder with: python -m benchmarks.server_load [clients] [games per client]'''
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+import statistics
+from server import GameServer
+from client import play_automatically
+from modules.data import Data
+from modules.scores import ScoreStore
+
+
+async def client(port, number, games, latencies, failures):
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError:
+        failures.append(number)
+        return
+    try:
+        await play_automatically(reader, writer, random.Random(number), f"bot{number}", games, latencies.append)
+    finally:
+        writer.close()
+
+
+async def run(clients, games):
+    with tempfile.TemporaryDirectory() as folder:
+        server = GameServer(Data(), ScoreStore(os.path.join(folder, "scores.db")))
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        latencies = []
+        failures = []
+        start = time.perf_counter()
+        await asyncio.gather(*(client(port, number, games, latencies, failures) for number in range(clients)))
+        elapsed = time.perf_counter() - start
+        listener.close()
+        await listener.wait_closed()
+        server.close()
+    latencies.sort()
+    print(f"clients:            {clients}")
+    print(f"failed connections: {len(failures)}")
+    print(f"games completed:    {server.games_served} in {elapsed:.2f} s ({server.games_served / elapsed:.0f} games/sec)")
+    print(f"answers:            {len(latencies)} ({len(latencies) / elapsed:.0f} answers/sec)")
+    if latencies:
+        print(f"answer round trip:  p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    asyncio.run(run(clients, games))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+'''Compares worker processes that each load their own Data with workers that attach to a dataset published once by the parent with SharedData. Workers are spawned, so nothing is inherited from the parent, and each one reports how long it took to get its data ready and how much private memory it holds once it has generated questions for every region, with the question indexes built. Run from the project folder with: python -m benchmarks.shared [--workers N]'''
+import time
+import argparse
+import multiprocessing
+from modules.data import Data
+from modules.shared import SharedData
+from modules.question import generate_questions
+
+REGIONS = ("World",) + tuple(Data.REGIONS)
+
+
+def private_kib():
+    '''Returns the memory this process dirtied itself (Private_Dirty in /proc/self/smaps_rollup) in KiB, or None where /proc is not available. Pages of a mapped file are clean and can be shared by every process, so they are not counted.'''
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    return sum(int(line.split()[1]) for line in lines if line.startswith("Private_Dirty:"))
+
+
+def worker(shared_path):
+    '''Runs in a spawned process: gets the data ready and generates questions for every region from it, returning (startup seconds, private KiB before loading, private KiB once the questions are generated).'''
+    before = private_kib()
+    start = time.perf_counter()
+    if shared_path:
+        data = SharedData.attach(shared_path)
+    else:
+        data = Data()
+        data.main()
+    startup = time.perf_counter() - start
+    for region in REGIONS:
+        for _ in generate_questions(data, region, ("capital", "languages", "dishes"), 200, seed=1):
+            pass
+    after = private_kib()
+    return (startup, before, after)
+
+
+def run_workers(count, shared_path):
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(count) as pool:
+        return pool.map(worker, [shared_path] * count)
+
+
+def report(name, results):
+    startups = sorted(startup for startup, _, _ in results)
+    print(f"{name}: startup median {startups[len(startups) // 2] * 1000:.1f} ms, max {startups[-1] * 1000:.1f} ms")
+    if results[0][1] is not None:
+        added = [after - before for _, before, after in results]
+        print(f"    private memory for the data and its indexes, per worker: {sum(added) / len(added):.0f} KiB, "
+              f"all {len(added)} workers: {sum(added)} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-worker data loading against a shared dataset.")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes (default 4)")
+    args = parser.parse_args()
+    data = Data()
+    report("own Data per worker", run_workers(args.workers, None))
+    start = time.perf_counter()
+    shared = SharedData.publish(data)
+    print(f"publishing the shared dataset took {(time.perf_counter() - start) * 1000:.1f} ms")
+    try:
+        report("attached to shared data", run_workers(args.workers, shared.path))
+    finally:
+        shared.unlink()
+
+
+if __name__ == "__main__":
+    main()
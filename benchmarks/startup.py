@@ -0,0 +1,62 @@
+'''Compares cold and warm Data startup. A cold start parses the country-json files and processes them; a warm start loads the compiled snapshots. Also compares loading every topic with loading only what a 'Capital Cities' game needs. Run from the project folder with: python -m benchmarks.startup'''
+import os
+import glob
+import sys
+import time
+import statistics
+import subprocess
+from modules.data import Data
+from modules.snapshot import Snapshot
+
+REPEATS = 20
+
+
+def time_call(function, repeats=REPEATS):
+    '''Returns the median wall time in milliseconds of calling function repeatedly.'''
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def time_process(use_snapshot, repeats=5):
+    '''Returns the median wall time in milliseconds of a fresh interpreter that imports and builds Data, which is what a short-lived worker pays.'''
+    code = f"from modules.data import Data; Data(use_snapshot={use_snapshot}).main()"
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def load_all(use_snapshot=True):
+    Data(use_snapshot).main()
+
+
+def load_capitals(use_snapshot=True):
+    Data(use_snapshot).get_answer_pairs("World", "capital")
+
+
+def main():
+    for path in glob.glob(Snapshot.PATH.format(topic="*")):
+        os.remove(path)
+    rebuild = time_call(load_all, repeats=1)
+    cold = time_call(lambda: load_all(False))
+    warm = time_call(load_all)
+    print(f"{'in-process cold start (parse JSON)':40} {cold:8.2f} ms")
+    print(f"{'in-process first start (parse + save)':40} {rebuild:8.2f} ms")
+    print(f"{'in-process warm start (snapshot)':40} {warm:8.2f} ms")
+    print(f"{'speedup':40} {cold / warm:8.1f} x")
+    print(f"{'cold start, capitals only':40} {time_call(lambda: load_capitals(False)):8.2f} ms")
+    print(f"{'warm start, capitals only':40} {time_call(load_capitals):8.2f} ms")
+    cold_process = time_process(False)
+    warm_process = time_process(True)
+    print(f"{'new process cold start':40} {cold_process:8.2f} ms")
+    print(f"{'new process warm start':40} {warm_process:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
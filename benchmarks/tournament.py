@@ -0,0 +1,68 @@
+'''Compares many players each playing their own game with the same players playing one shared tournament Round, and checks that a round's scores are written in one batch. Run from the project folder with: python -m benchmarks.tournament [--players N]'''
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from main import Game
+from modules.data import Data
+from modules.scores import ScoreStore
+from modules.tournament import Round
+from benchmarks.common import BenchmarkGame, play_games
+
+REGION = "World"
+CATEGORIES = ('capital', 'languages', 'dishes')
+
+
+def separate_games(data, players):
+    games = []
+    for player in range(players):
+        game = BenchmarkGame(data)
+        game.username, game.region, game.categories = f"player{player}", REGION, CATEGORIES
+        games.append(game)
+    list(play_games(games))
+    return games
+
+
+def tournament(data, players):
+    shared_round = Round.generate(data, REGION, CATEGORIES, Game.QUESTION_LIMIT)
+    games = []
+    for player in range(players):
+        game = shared_round.join(BenchmarkGame(data))
+        game.username = f"player{player}"
+        games.append(game)
+    list(play_games(games))
+    return shared_round
+
+
+def measure(function, *args):
+    '''Returns the seconds function takes and the peak memory it allocates in KiB.'''
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tournament rounds against separate games.")
+    parser.add_argument("--players", type=int, default=1000, help="players (default 1000)")
+    args = parser.parse_args()
+    data = Data()
+    for name, function in (("separate games", separate_games), ("one shared round", tournament)):
+        elapsed, peak = measure(function, data, args.players)
+        print(f"{name:18} {elapsed:7.3f} s, {args.players / elapsed:8.0f} games/sec, peak {peak:8.0f} KiB")
+    shared_round = tournament(data, args.players)
+    with tempfile.TemporaryDirectory() as folder:
+        store = ScoreStore(os.path.join(folder, "scores.db"))
+        start = time.perf_counter()
+        recorded = shared_round.finish(store)
+        print(f"recorded {recorded} scores in one batch in {(time.perf_counter() - start) * 1000:.1f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
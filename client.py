@@ -0,0 +1,108 @@
+'''Connects to a trivia server (see server.py). By default the player types answers as with main.py; with --auto the client answers at random, which is how the load test drives the server. Usage: python client.py [--host HOST] [--port PORT] [--auto]'''
+import sys
+import random
+import asyncio
+import argparse
+
+PROMPT = "> "
+LETTERS = ("A", "B", "C", "D")
+
+
+async def read_until_prompt(reader):
+    '''Returns the text lines sent before the next prompt, and the prompt as a (kind, text) tuple, or None for the prompt if the server closed the connection.'''
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            return lines, None
+        line = line.decode("utf-8").rstrip("\n")
+        if line.startswith(PROMPT):
+            kind, _, text = line[len(PROMPT):].partition(" ")
+            return lines, (kind, text)
+        lines.append(line)
+
+
+def choose_automatically(kind, lines, rng, name, games_left):
+    '''Picks a reply to a prompt the way a random player would.'''
+    if kind == "name":
+        return name
+    if kind == "menu":
+        # menu lines look like "3: Europe"
+        options = [line for line in lines if line.partition(":")[0].isdigit()]
+        return str(rng.randint(1, max(1, len(options))))
+    if kind == "answer":
+        return rng.choice(LETTERS)
+    if kind == "text":
+        # free-text mode: type one of the words in the question
+        words = [word.strip("?") for line in lines for word in line.split()]
+        return rng.choice(words) if words else ""
+    if kind == "report":
+        return "s"
+    if kind == "again":
+        return "s" if games_left > 1 else "q"
+    return ""
+
+
+async def play_automatically(reader, writer, rng, name="bot", games=1, on_answer=None):
+    '''Plays games complete games at random. on_answer, if given, is called with the seconds between sending an answer and receiving the next prompt.'''
+    menu_lines = []
+    games_left = games
+    answered_at = None
+    while True:
+        lines, prompt = await read_until_prompt(reader)
+        if prompt is None:
+            return
+        kind, text = prompt
+        if answered_at is not None and on_answer:
+            on_answer(asyncio.get_running_loop().time() - answered_at)
+            answered_at = None
+        if kind == "menu":
+            # the options arrive before the first "Your choice?" prompt, re-prompts don't repeat them
+            menu_lines = lines or menu_lines
+        reply = choose_automatically(kind, menu_lines if kind == "menu" else lines, rng, name, games_left)
+        if kind == "again":
+            games_left -= 1
+        writer.write((reply + "\n").encode("utf-8"))
+        await writer.drain()
+        if kind in ("answer", "text"):
+            answered_at = asyncio.get_running_loop().time()
+
+
+async def play_interactively(reader, writer):
+    loop = asyncio.get_running_loop()
+    while True:
+        lines, prompt = await read_until_prompt(reader)
+        for line in lines:
+            print(line)
+        if prompt is None:
+            return
+        reply = await loop.run_in_executor(None, input, prompt[1] + " ")
+        writer.write((reply + "\n").encode("utf-8"))
+        await writer.drain()
+
+
+async def run(host, port, auto):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        if auto:
+            await play_automatically(reader, writer, random.Random())
+        else:
+            await play_interactively(reader, writer)
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play trivia on a trivia server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--auto", action="store_true", help="answer at random")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.auto))
+    except (KeyboardInterrupt, EOFError, ConnectionError):
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
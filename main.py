@@ -1,15 +1,15 @@
-from modules.data import Data
-from modules.question import Question
-from modules.scores import Scores
+from modules.data import Data, InsufficientDataError
+from modules.question import Question, Session, question_result
+from modules.scores import Scores, ScoreStore
+from modules.difficulty import DifficultyStats
 
 
-class Game:
+class Game(Session):
     '''Plays a round a of trivia.'''
     TESTING = False     # If TESTING, answers will be automatically answered at random, with user choices determined by TEST_VALUES
     TEST_VALUES = ("Test User", "World",
                    ('capital', 'languages', 'dishes'))
     QUESTION_LIMIT = 10     # how many questions to ask per game
-    LETTERS = ("A", "B", "C", "D")  # choices given to user for each question
     HOLD_FEEDBACK = True    # If True, hold detailed feedback to end of game
     QUESTION_FORMATS = {
         # These are the different topics the user can play. The keywords in the tuples represent dictionary keys in game.data.countries and game.data.items
@@ -20,36 +20,77 @@ class Game:
     }
     # same dictionary in reverse for score reporting
     TOPIC_NAMES = dict(zip(QUESTION_FORMATS.values(), QUESTION_FORMATS.keys()))
+    ANSWER_MODES = {
+        # option shown to the user -> value of free_text
+        'Multiple choice': False,
+        'Type the answer': True
+    }
 
-    def __init__(self, data):
+    def __init__(self, data, seed=None):
+        # data, region, categories, question_counter, used questions and the random generator are set up by Session
+        super().__init__(data, seed=seed)
         self.keep_playing = True  # if False, program will exit
-        self.data = data   # The data object that questions are generated from
         self.username = None
-        self.region = None
-        self.categories = None
         self.score = 0
-        self.question_counter = 1
-        self.used = {
-            # Primary purpose of this variable is for tracking what's been asked, in order to avoid repeating questions in the same game. It's also a convenient place to put problematic data items until these can be fixed.
-            'countries': ["Luxembourg"],
-            'items': ["", " ", "English", "its Thai name)", "S"]
-        }
-        self.questions = []
+        self.results = []   # a Result per answered question, see record_answer
+        self.round = None   # a tournament Round this game plays, see modules.tournament
+
+    def prompt(self, message, test_answer=""):
+        '''Gets a line of input from the user, or returns test_answer straight away when TESTING so games can run unattended.'''
+        if self.TESTING:
+            return test_answer
+        return input(message)
+
+    def menu_text(self, options):
+        '''Returns a list of options formatted as a numbered menu.'''
+        lines = [str(place)+': '+str(option)
+                 for place, option in enumerate(options, 1)]
+        return "\n".join(lines) + "\n"
+
+    def parse_option(self, options, answer):
+        '''Returns the option selected by the answer typed by the user, or None if it isn't a valid menu number.'''
+        answer = answer.strip()
+        if not answer.isdigit() or int(answer) > len(options) or int(answer) < 1:
+            return None
+        return options[int(answer)-1]
 
     def option_menu(self, options):
         '''Takes a list of options, prints them as a menu and returns the option selected by the user.'''
-        # print options as a numbered list
-        for place in range(1, len(options)+1):
-            item = options[place-1]
-            print(str(place)+':', item)
-        # get response and return string
-        print("")
+        print(self.menu_text(options))
         while True:
-            answer = input("Your choice? ")
-            if not answer.isdigit() or int(answer) > len(options) or int(answer) < 1:
+            answer = self.parse_option(options, input("Your choice? "))
+            if answer is None:
                 print("Please enter a valid digit.")
             else:
-                return options[int(answer)-1]
+                return answer
+
+    def check_username(self, username):
+        '''Returns an error message if username can't be used, otherwise None.'''
+        if "_" in username:
+            return "Underscores are not allowed in usernames"
+        return None
+
+    def is_playable(self, region, categories):
+        return self.capacity(region, categories) >= self.QUESTION_LIMIT
+
+    def region_options(self):
+        '''Returns the regions that can be played with at least one topic.'''
+        return [region for region in self.data.countries['major region'].keys()
+                if any(self.is_playable(region, categories) for categories in self.QUESTION_FORMATS.values())]
+
+    def topic_options(self):
+        '''Returns the topics that can be played for the selected region.'''
+        return [topic for topic, categories in self.QUESTION_FORMATS.items()
+                if self.region is None or self.is_playable(self.region, categories)]
+
+    def answer_mode_options(self):
+        return list(self.ANSWER_MODES.keys())
+
+    def check_selection(self):
+        '''Returns an error message if the selected region and categories can't be played, otherwise None.'''
+        if not self.is_playable(self.region, self.categories):
+            return f"Sorry, insufficient data available to play {self.TOPIC_NAMES[self.categories]} for the region {self.region}. Please make a different selection."
+        return None
 
     def start_game(self):
         '''Guides user through the initial decisions that must be set before asking questions.'''
@@ -59,53 +100,110 @@ class Game:
         else:
             while True:
                 self.username = input("Who's playing [type your name]? \n")
-                if not "_" in self.username:
+                error = self.check_username(self.username)
+                if not error:
                     break
                 else:
-                    print("Underscores are not allowed in usernames")
+                    print(error)
             while True:
                 print("Choose the region you will play. \n")
-                self.region = self.option_menu(
-                    list(self.data.countries['major region'].keys()))
+                self.region = self.option_menu(self.region_options())
                 # ask to choose QUESTION TOPIC
                 print("Choose the topics you will play. \n")
                 self.categories = self.QUESTION_FORMATS[self.option_menu(
-                    list(self.QUESTION_FORMATS.keys()))]
-                if self.region == "Oceania" and self.categories == "dishes":
-                    print(
-                        f"Sorry, insufficient data available to play {self.categories} for the region {self.region}. Please make a different selection.")
+                    self.topic_options())]
+                error = self.check_selection()
+                if error:
+                    print(error)
                 else:
                     break
+            print("Choose how you will answer. \n")
+            self.free_text = self.ANSWER_MODES[self.option_menu(self.answer_mode_options())]
         return self.username, self.region, self.categories
 
-    def final_report(self):
-        correct = []
-        incorrect = []
-        for q in self.questions:
-            if q.answered_correctly:
-                correct.append(q)
+    def play(self):
+        '''Asks questions until the game is over. If the data runs out of questions first, the game ends early, as it does on the server.'''
+        try:
+            while not self.game_over():
+                question = self.next_question()
+                question.ask(self.TESTING)
+                self.record_answer(question)
+        except InsufficientDataError as error:
+            print(f"\n{error} The game ends here.")
+
+    def replay(self, answers):
+        '''Plays the game without any I/O, answering each question in turn from answers, the user_choice, or user_text in free-text mode, of every question of a recorded game. Started with the recorded game's seed, region, categories and answer mode, and the seen filter and difficulty counters it had, the replay asks exactly the same questions. Answers picked at random by TESTING come from the game's generator, so those games are replayed by playing them again instead. Returns the questions.'''
+        questions = []
+        for answer in answers:
+            if self.game_over():
+                break
+            question = self.next_question()
+            if self.free_text:
+                question.answer_text(answer)
             else:
-                incorrect.append(q)
-        print(f"\nYou answered {len(correct)} questions correctly.\n")
-        for q in correct:
-            print(f"\nQuestion {q.number}:")
-            print(q.feedback.correct_items_statement)
+                question.answer(answer)
+            self.record_answer(question)
+            questions.append(question)
+        return questions
+
+    def game_over(self):
+        return self.question_counter > self.QUESTION_LIMIT
+
+    def next_question(self):
+        if self.round is not None:
+            return self.round.play_question(self)
+        return Question(self)
+
+    def record_answer(self, question):
+        '''Updates the score and the record of asked questions once question has been answered.'''
+        if question.answered_correctly:
+            self.score += 1
+        self.mark_used(question)
+        # only the compact result is kept, the question itself is freed once answered
+        self.results.append(question_result(question))
+        self.question_counter += 1
+        if self.game_over():
+            # the pools of pairs not yet drawn are only needed for more questions, and are rebuilt if asked for
+            self.pools = {}
+            self.deferred = {}
+
+    def correct_report(self):
+        '''Returns the detailed report text for the questions answered correctly.'''
+        correct = [r for r in self.results if r.answered_correctly]
+        lines = [f"\nYou answered {len(correct)} questions correctly.\n"]
+        for r in correct:
+            statement = r.correct_items_statement(self.data)
+            lines.append(f"\nQuestion {r.number}:")
+            lines.append(statement)
             # TODO make this test more robust
-            if "," in q.feedback.correct_items_statement:
-                print(q.feedback.you_said)
-        input("\nPress Enter to review incorrect answers\n")
-        print(f"You answered {len(incorrect)} questions incorrectly.")
-        for q in incorrect:
-            print(f"\nQuestion {q.number}:")
-            print(q.feedback.looking_for)
-            print(q.feedback.correct_items_statement)
-            print(q.feedback.you_said)
+            if "," in statement:
+                lines.append(r.you_said)
+        return "\n".join(lines)
+
+    def incorrect_report(self):
+        '''Returns the detailed report text for the questions answered incorrectly.'''
+        incorrect = [r for r in self.results if not r.answered_correctly]
+        lines = [f"You answered {len(incorrect)} questions incorrectly."]
+        for r in incorrect:
+            lines.append(f"\nQuestion {r.number}:")
+            lines.append(r.looking_for)
+            lines.append(r.correct_items_statement(self.data))
+            lines.append(r.you_said)
+        return "\n".join(lines)
+
+    def final_report(self):
+        print(self.correct_report())
+        self.prompt("\nPress Enter to review incorrect answers\n")
+        print(self.incorrect_report())
 
 
 def main():
     '''Play rounds of trivia repeatedly until user exits.'''
     print("\nWorld Geography Trivia Game \n")
     data = Data()
+    score_store = ScoreStore()
+    # answers of every game in this process feed the same difficulty counters
+    difficulty = DifficultyStats()
     new_game = True
     reuse_settings = False
     while True:
@@ -114,35 +212,31 @@ def main():
             game.start_game()
             new_game = False
         elif reuse_settings:
-            game.__init__(data)
-            game.score = 0
-            game.question_counter = 1
-            game.username, game.region, game.categories = reuse_settings
-        while game.question_counter <= game.QUESTION_LIMIT:
-            question = Question(game)
-            question.ask(game.TESTING)
-            if question.answered_correctly:
-                game.score += 1
-            game.used['countries'].append(question.answer_pair['country'])
-            game.used['items'].append(question.answer_pair['item'])
-            game.questions.append(question)
-            game.question_counter += 1
+            # a new game rather than the old one reset, so nothing of the last game is kept alive
+            game = Game(data)
+            game.username, game.region, game.categories, game.free_text = reuse_settings
+        # questions from the user's recent games are only asked again once fresh ones run out
+        game.seen = score_store.load_seen(game.username)
+        game.difficulty = difficulty
+        game.play()
         if game.HOLD_FEEDBACK:
             # TODO show immediate question feedback if not HOLD_FEEDBACK
-            report_choice = input(
+            report_choice = game.prompt(
                 "\nSee detailed report? Enter S to skip, anything else to continue: ")
             if report_choice.lower() != "s":
                 game.final_report()
-        input("Press Enter to see score report")
-        scores = Scores(game)
+        game.prompt("Press Enter to see score report")
+        scores = Scores(game, score_store)
         scores.report_results()
         scores.update_records()
+        scores.report_leaderboard()
         while True:
-            end_choice = input(
-                "\nPlay again as [s]ame user and settings, [d]ifferent user / settings, or [q]uit game? ")
+            # a TESTING game quits after one round
+            end_choice = game.prompt(
+                "\nPlay again as [s]ame user and settings, [d]ifferent user / settings, or [q]uit game? ", "q")
             if end_choice.lower() == "s":
                 new_game = False
-                reuse_settings = (game.username, game.region, game.categories)
+                reuse_settings = (game.username, game.region, game.categories, game.free_text)
                 break
             elif end_choice.lower() == "d":
                 new_game = True
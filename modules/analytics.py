@@ -0,0 +1,115 @@
+import math
+import time
+from modules.hashing import stable_hash
+
+DAY = 24 * 60 * 60
+
+
+class HyperLogLog:
+    '''Approximate count of distinct values in 2 ** precision one byte registers, however many values are added. Each value's hash picks a register by its low bits and the register keeps the longest run of leading zeros seen in the remaining bits; the count is estimated from the harmonic mean of the registers. The standard error is about 1.04 / sqrt(2 ** precision), 1.6% at the default precision of 12.'''
+
+    def __init__(self, precision=12) -> None:
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value_hash):
+        '''Adds a value by its 64 bit hash, see stable_hash.'''
+        index = value_hash & (self.size - 1)
+        rank = 64 - self.precision - (value_hash >> self.precision).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        # registers only hold small ranks, so each distinct rank is summed once
+        harmonic = sum(self.registers.count(rank) * 2.0 ** -rank for rank in set(self.registers))
+        estimate = alpha * size * size / harmonic
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # small counts are estimated better from the share of empty registers
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+
+class GroupStats:
+    '''Running statistics of the games in one group, e.g. one region and topic. The score histogram has one entry per distinct score, and users are counted in HyperLogLogs, so a group takes the same memory after ten games as after ten million.'''
+
+    def __init__(self, precision=12) -> None:
+        self.games = 0
+        self.total = 0
+        self.histogram = {}   # score -> games
+        self.users = HyperLogLog(precision)
+        self.active_users = HyperLogLog(precision)
+        self.first_played = None
+        self.last_played = None
+
+    def add(self, user, score, played_at, active):
+        '''Adds a game, with user the hash of its username and active True if it was played within the active window.'''
+        self.games += 1
+        self.total += score
+        self.histogram[score] = self.histogram.get(score, 0) + 1
+        self.users.add(user)
+        if active:
+            self.active_users.add(user)
+        if played_at:
+            # games imported from the old score file have no date
+            if self.first_played is None or played_at < self.first_played:
+                self.first_played = played_at
+            if self.last_played is None or played_at > self.last_played:
+                self.last_played = played_at
+
+    def mean(self):
+        return self.total / self.games if self.games else None
+
+    def percentile(self, share):
+        '''Returns the lowest score that at least share of the games, from 0 to 1, are at or below.'''
+        needed = share * self.games
+        seen = 0
+        for score in sorted(self.histogram):
+            seen += self.histogram[score]
+            if seen >= needed:
+                return score
+        return None
+
+    def percentile_ranks(self):
+        '''Returns a list of (score, games, percentile rank) tuples from the lowest score up. A score's percentile rank is the share of games scoring below it plus half the games scoring the same, as a percentage.'''
+        ranks = []
+        below = 0
+        for score in sorted(self.histogram):
+            games = self.histogram[score]
+            ranks.append((score, games, 100 * (below + games / 2) / self.games))
+            below += games
+        return ranks
+
+
+class ScoreAnalytics:
+    '''Game counts, score distributions, percentile ranks and active users per region and topic, gathered in a single pass over the score records. Every game is added to four groups: its region and topic, its region over all topics, its topic over all regions, and everything. Groups are keyed by (region, categories key), with None for all of either, and memory grows with the number of groups, never with the number of games.'''
+    ACTIVE_DAYS = 30
+
+    def __init__(self, active_days=ACTIVE_DAYS, now=None, precision=12) -> None:
+        self.active_days = active_days
+        # games played at or after this time count towards the active users
+        self.active_since = (time.time() if now is None else now) - active_days * DAY
+        self.precision = precision
+        self.groups = {}
+
+    def group(self, key):
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = GroupStats(self.precision)
+        return stats
+
+    def add(self, username, region, categories, score, played_at):
+        '''Adds one game. categories is the key the score records use, see categories_key.'''
+        user = stable_hash(username)
+        active = played_at >= self.active_since
+        for key in ((region, categories), (region, None), (None, categories), (None, None)):
+            self.group(key).add(user, score, played_at, active)
+
+    def add_games(self, games):
+        '''Adds every (username, region, categories key, score, played_at) tuple from an iterable, e.g. ScoreStore.iter_games, consuming it as it goes. Returns self.'''
+        for game in games:
+            self.add(*game)
+        return self
@@ -0,0 +1,17 @@
+import os
+import threading
+import contextlib
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    '''Opens a temporary file next to path for binary writing and moves it over path once the block is done, so readers only ever see the old file or the whole new one. The temporary file is removed if the block raises.'''
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,112 @@
+import array
+from modules.compact import StringTable
+from modules.formats import FORMATS
+from modules.mapped import LayoutWriter, LayoutReader
+
+
+class QuestionBank:
+    '''Pregenerated questions stored column by column in one memory-mapped file, so serving processes can draw from a large bank without loading it. Every column is a fixed-width array with one entry per question: string ids for the country, the item and each letter's choice, and small ids for the format and the correct letter. Strings are interned in a single table, and questions are grouped by region and category, with the header giving each group's range, so drawing a random question reads one entry from each column without deserializing anything.'''
+    MAGIC = b"GEOBANK1"
+    LETTERS = ("A", "B", "C", "D")
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.reader = LayoutReader(path, self.MAGIC, "a question bank")
+        layout = self.reader.layout
+        self.count = layout['count']
+        self.formats = layout['formats']
+        # (region, category) -> (first question, number of questions)
+        self.groups = layout['groups']
+        self.strings = self.reader.table(layout['strings'])
+        self.columns = {name: self.reader.array(position, typecode, self.count)
+                        for name, (position, typecode) in layout['columns'].items()}
+
+    @classmethod
+    def write(cls, path, records):
+        '''Writes a bank of records (see Question.to_record) to path.'''
+        groups = {}
+        strings = set()
+        for record in records:
+            choices = tuple(record['choices'][letter] for letter in cls.LETTERS)
+            groups.setdefault((record['region'], record['category']), []).append(
+                (tuple(record['format']), record['country'], record['item'], record['correct'], choices))
+            strings.add(record['country'])
+            strings.add(record['item'])
+            strings.update(choices)
+        strings = sorted(strings)
+        string_ids = {string: string_id for string_id, string in enumerate(strings)}
+        table = StringTable.build(strings)
+        formats = sorted({row[0] for rows in groups.values() for row in rows})
+        format_ids = {question_format: format_id for format_id, question_format in enumerate(formats)}
+
+        columns = {
+            'country': array.array("I"),
+            'item': array.array("I"),
+            'format': array.array("B"),
+            'correct': array.array("B")
+        }
+        for letter in cls.LETTERS:
+            columns['choice ' + letter] = array.array("I")
+        group_ranges = {}
+        for key in sorted(groups):
+            group_ranges[key] = (len(columns['country']), len(groups[key]))
+            for question_format, country, item, correct, choices in groups[key]:
+                columns['country'].append(string_ids[country])
+                columns['item'].append(string_ids[item])
+                columns['format'].append(format_ids[question_format])
+                columns['correct'].append(cls.LETTERS.index(correct))
+                for letter, choice in zip(cls.LETTERS, choices):
+                    columns['choice ' + letter].append(string_ids[choice])
+
+        writer = LayoutWriter(cls.MAGIC)
+        layout = {
+            'count': len(columns['country']),
+            'formats': formats,
+            'groups': group_ranges,
+            'strings': writer.add_table(table),
+            'columns': {name: (writer.add(values), values.typecode) for name, values in columns.items()}
+        }
+        writer.write(path, layout)
+        return cls(path)
+
+    def group_size(self, region, category):
+        return self.groups.get((region, category), (0, 0))[1]
+
+    def record(self, index):
+        '''Returns question index as a record like Question.to_record, without the feedback, which needs the data.'''
+        columns = self.columns
+        strings = self.strings
+        question_format = self.formats[columns['format'][index]]
+        country = strings[columns['country'][index]]
+        item = strings[columns['item'][index]]
+        answer_pair = {'country': country, 'item': item}
+        return {
+            'format': list(question_format),
+            'category': FORMATS[question_format].category,
+            'country': country,
+            'item': item,
+            'text': FORMATS[question_format].question_text(answer_pair),
+            'choices': {letter: strings[columns['choice ' + letter][index]] for letter in self.LETTERS},
+            'correct': self.LETTERS[columns['correct'][index]]
+        }
+
+    def sample(self, region, categories, rng):
+        '''Returns a random record for region and categories, a category or a tuple of them, with every question in those groups equally likely. Raises KeyError if the bank has none.'''
+        if type(categories) != tuple:
+            categories = (categories,)
+        ranges = [self.groups[(region, category)] for category in categories if (region, category) in self.groups]
+        total = sum(count for start, count in ranges)
+        if not total:
+            raise KeyError((region, categories))
+        pick = rng.randrange(total)
+        for start, count in ranges:
+            if pick < count:
+                record = self.record(start + pick)
+                record['region'] = region
+                return record
+            pick -= count
+
+    def close(self):
+        self.columns = {}
+        self.strings = None
+        self.reader.close()
@@ -0,0 +1,208 @@
+import array
+import bisect
+from modules.data import QuestionIndexes
+
+
+class StringTable:
+    '''A set of strings stored as one UTF-8 blob and an array of offsets into it. Strings are kept in sorted order, so a string's id is its position and a name is found by binary search. The blob can be bytes or anything else whose slices are bytes, such as an mmap.'''
+
+    def __init__(self, blob, offsets) -> None:
+        self.blob = blob
+        self.offsets = offsets
+        # every string, decoded on first use, see names
+        self.decoded = None
+
+    @classmethod
+    def build(cls, strings):
+        encoded = [string.encode("utf-8") for string in sorted(set(strings))]
+        offsets = array.array("i", [0])
+        total = 0
+        for string in encoded:
+            total += len(string)
+            offsets.append(total)
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def names(self):
+        '''Returns a list of every string by id. Decoded once and kept, so each string is a single object however many indexes and lookups use it.'''
+        if self.decoded is None:
+            blob = self.blob
+            offsets = self.offsets
+            self.decoded = [str(blob[offsets[i]:offsets[i+1]], "utf-8") for i in range(len(self))]
+        return self.decoded
+
+    def __getitem__(self, string_id):
+        return self.names()[string_id]
+
+    def find(self, name):
+        '''Returns the id of name, or -1 if it is not in the table. UTF-8 keeps the code point order that strings compare by, so the decoded names are searched as they are.'''
+        names = self.names()
+        string_id = bisect.bisect_left(names, name)
+        if string_id < len(names) and names[string_id] == name:
+            return string_id
+        return -1
+
+
+class Adjacency:
+    '''Compressed sparse rows of integer ids: the ids in row i are targets[offsets[i]:offsets[i+1]].'''
+
+    def __init__(self, offsets, targets) -> None:
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def build(cls, rows):
+        offsets = array.array("i", [0])
+        targets = array.array("i")
+        for row in rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    def row(self, row_id):
+        return self.targets[self.offsets[row_id]:self.offsets[row_id+1]]
+
+    def row_length(self, row_id):
+        return self.offsets[row_id+1] - self.offsets[row_id]
+
+
+class NamedRow:
+    '''Read-only sequence of the strings one Adjacency row refers to, decoded from a StringTable as it is iterated, so nothing per row is kept.'''
+    __slots__ = ("ids", "names")
+
+    def __init__(self, adjacency, row_id, table) -> None:
+        self.ids = adjacency.row(row_id)
+        self.names = table.names()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        return self.names[self.ids[index]]
+
+    def __iter__(self):
+        return map(self.names.__getitem__, self.ids)
+
+
+class CompactTopic:
+    '''Read-only, dict-like view of one topic of the items or countries dictionary, e.g. items['capital']. Keys and values are looked up as ids and decoded back to strings, and a lookup returns a tuple instead of a list. Keys with an empty row count as missing, the same as keys that are not in a Data dictionary.'''
+
+    def __init__(self, keys, adjacency, values) -> None:
+        self.keys_table = keys
+        self.adjacency = adjacency
+        self.values_table = values
+        # counted on first use, so attaching to shared data doesn't scan every row
+        self.length = None
+
+    def row_values(self, row):
+        return tuple(map(self.values_table.names().__getitem__, row))
+
+    def __getitem__(self, name):
+        key_id = self.keys_table.find(name)
+        row = self.adjacency.row(key_id) if key_id >= 0 else None
+        if not row:
+            raise KeyError(name)
+        return self.row_values(row)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        key_id = self.keys_table.find(name)
+        return key_id >= 0 and self.adjacency.row_length(key_id) > 0
+
+    def __iter__(self):
+        for key_id in range(len(self.keys_table)):
+            if self.adjacency.row_length(key_id):
+                yield self.keys_table[key_id]
+
+    def __len__(self):
+        if self.length is None:
+            self.length = sum(1 for key_id in range(len(self.keys_table)) if self.adjacency.row_length(key_id))
+        return self.length
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        for key_id in range(len(self.keys_table)):
+            if self.adjacency.row_length(key_id):
+                yield (self.keys_table[key_id], self.row_values(self.adjacency.row(key_id)))
+
+
+class CompactData(QuestionIndexes):
+    '''Alternative in-memory layout of a Data object for processes that run many workers per host. Country names and each topic's items are interned into string tables, and the country -> items and item -> countries lookups of Data.items and Data.countries are stored as integer arrays. items and countries are views with the same lookups Question uses, and the question indexes are shared with Data.'''
+
+    def __init__(self, country_table, topics, distractor_arrays=None) -> None:
+        # topics: topic -> (item table, country -> items adjacency, item -> countries adjacency)
+        self.country_table = country_table
+        self.topics = topics
+        self.items = {}
+        self.countries = {}
+        for topic, (item_table, country_items, item_countries) in topics.items():
+            self.items[topic] = CompactTopic(country_table, country_items, item_table)
+            self.countries[topic] = CompactTopic(item_table, item_countries, country_table)
+        self.set_indexes()
+        # (region, category) -> (distractors, distractor items, their distractor positions) adjacencies, see build_distractor_arrays; the ones given are read from instead of built
+        self.distractor_arrays = distractor_arrays or {}
+
+    def get_distractors(self, region, category, country):
+        arrays = self.distractor_arrays.get((region, category))
+        if arrays is None:
+            return super().get_distractors(region, category, country)
+        return NamedRow(arrays[0], self.country_table.find(country), self.country_table)
+
+    def get_distractor_items(self, region, category, country):
+        arrays = self.distractor_arrays.get((region, category))
+        if arrays is None:
+            return super().get_distractor_items(region, category, country)
+        country_id = self.country_table.find(country)
+        return (NamedRow(arrays[1], country_id, self.topics[category][0]), arrays[2].row(country_id))
+
+    def build_distractor_arrays(self, categories):
+        '''Returns get_distractors and get_distractor_items of every country for every region and one of categories as id arrays, for SharedData to publish: (region, category) -> (distractors, distractor items, the position of each item's distractor), each an Adjacency with a row per country id.'''
+        arrays = {}
+        country_table = self.country_table
+        for region in self.countries['major region']:
+            for category in categories:
+                item_table = self.topics[category][0]
+                answer_countries = set(self.get_region_countries(region, category))
+                rows = ([], [], [])
+                for country in country_table.names():
+                    if country in answer_countries:
+                        items, positions = self.get_distractor_items(region, category, country)
+                        rows[0].append([country_table.find(candidate) for candidate in self.get_distractors(region, category, country)])
+                        rows[1].append([item_table.find(item) for item in items])
+                        rows[2].append(positions.tolist())
+                    else:
+                        for row in rows:
+                            row.append(())
+                arrays[(region, category)] = tuple(Adjacency.build(row) for row in rows)
+        return arrays
+
+    @classmethod
+    def from_data(cls, data):
+        '''Builds the compact layout from every topic of a Data object.'''
+        data.main()
+        country_names = set()
+        for topic in data.items:
+            country_names.update(data.items[topic])
+            for countries in data.countries[topic].values():
+                country_names.update(countries)
+        country_table = StringTable.build(country_names)
+        topics = {}
+        for topic in data.items:
+            item_table = StringTable.build(data.countries[topic])
+            country_items = Adjacency.build(
+                [item_table.find(item) for item in data.items[topic].get(country_table[country_id], ())]
+                for country_id in range(len(country_table)))
+            item_countries = Adjacency.build(
+                [country_table.find(country) for country in data.countries[topic].get(item_table[item_id], ())]
+                for item_id in range(len(item_table)))
+            topics[topic] = (item_table, country_items, item_countries)
+        return cls(country_table, topics)
@@ -1,9 +1,180 @@
 import os
 import json
-import random
+import array
+import threading
+from modules.snapshot import Snapshot
+from modules.fuzzy import FuzzyIndex
 
 
-class Data:
+class InsufficientDataError(Exception):
+    '''Raised when the data cannot supply enough distinct questions or answer choices for a region and topic.'''
+
+
+class QuestionIndexes:
+    '''Indexes that questions are generated from, built on first use from the items and countries dictionaries of the class it is mixed into. Shared by Data and CompactData, which only differ in how those dictionaries are stored.'''
+    CAPACITY_CAP = 100   # capacities are only computed up to this many questions
+    # Valid data that makes poor questions, kept for feedback but never asked about or offered as a choice: Luxembourg's capital gives the answer away, and English is spoken too widely to pin down a country.
+    UNASKED_COUNTRIES = frozenset({"Luxembourg"})
+    UNASKED_ITEMS = frozenset({"English"})
+
+    def set_indexes(self):
+        # (region, category) -> tuple of (country, item) pairs that can be the answer to a question
+        self.answer_pairs = {}
+        # (region, category) -> tuple of the countries in region with data for category
+        self.region_countries = {}
+        # category -> country -> set of countries that share at least one item with it, including itself
+        self.conflicts = {}
+        # (region, category) -> country -> tuple of countries that are valid wrong answers for it
+        self.distractors = {}
+        # (region, category) -> country -> (tuple of the distinct items of its distractors, position in its distractors of the one each item was found in)
+        self.distractor_items = {}
+        # category, or "country" -> FuzzyIndex of the answers that can be typed in free-text mode
+        self.fuzzy_indexes = {}
+        # (region, categories, wrong choices, excluded countries, excluded items) -> questions a game can be sure to get
+        self.capacities = {}
+        # held while an index is built, see cached; reentrant because building one index can build others
+        self.index_lock = threading.RLock()
+
+    def cached(self, cache, key, build):
+        '''Returns cache[key], calling build to fill it on first use.'''
+        # Lookups of built indexes take no lock, so games on many threads read them freely; builds take index_lock and check again, so an index is only built once and never seen half built.
+        value = cache.get(key)
+        if value is None:
+            with self.index_lock:
+                value = cache.get(key)
+                if value is None:
+                    value = cache[key] = build()
+        return value
+
+    def get_answer_pairs(self, region, category):
+        '''Returns a tuple of every (country, item) pair in region that can be the answer to a question of category. Built once per region and category, then shared by every game.'''
+        def build():
+            pairs = []
+            for country in self.countries['major region'][region]:
+                if country in self.UNASKED_COUNTRIES:
+                    continue
+                for item in self.items[category].get(country, ()):
+                    if item not in self.UNASKED_ITEMS:
+                        pairs.append((country, item))
+            return tuple(pairs)
+        return self.cached(self.answer_pairs, (region, category), build)
+
+    def get_region_countries(self, region, category):
+        '''Returns a tuple of the countries in region that have data for category, in the same order as the region list.'''
+        def build():
+            pairs = self.get_answer_pairs(region, category)
+            return tuple(dict.fromkeys(country for country, item in pairs))
+        return self.cached(self.region_countries, (region, category), build)
+
+    def get_conflicts(self, category):
+        '''Returns a dictionary of every country with data for category, mapped to the set of countries it has an item in common with. Countries in conflict can't be offered as wrong answers for each other. Uses the countries dictionary, which maps each item to the countries that share it, as the index; built on first use.'''
+        def build():
+            conflicts = {}
+            for country, items in self.items[category].items():
+                conflicting = {country}
+                for item in items:
+                    conflicting.update(self.countries[category][item])
+                conflicts[country] = frozenset(conflicting)
+            return conflicts
+        return self.cached(self.conflicts, category, build)
+
+    def get_distractors(self, region, category, country):
+        '''Returns a tuple of the countries in region that can be offered as wrong answers when country is the correct answer for category: the region's countries with data, minus the ones that share an item with country.'''
+        def build():
+            conflicting = self.get_conflicts(category)[country]
+            return tuple(
+                candidate for candidate in self.get_region_countries(region, category) if candidate not in conflicting)
+        by_country = self.cached(self.distractors, (region, category), dict)
+        return self.cached(by_country, country, build)
+
+    def get_distractor_items(self, region, category, country):
+        '''Returns the distinct items of country's distractors, see get_distractors, that can be offered as wrong answers when the choices are items: a tuple of the items, and a sequence of the same length with the position in get_distractors of the first distractor that has each one.'''
+        def build():
+            positions = {}
+            for position, candidate in enumerate(self.get_distractors(region, category, country)):
+                for item in self.items[category][candidate]:
+                    if item not in self.UNASKED_ITEMS and item not in positions:
+                        positions[item] = position
+            # a region never has enough countries for a position to need more than two bytes
+            return (tuple(positions), array.array("H", positions.values()))
+        by_country = self.cached(self.distractor_items, (region, category), dict)
+        return self.cached(by_country, country, build)
+
+    def spare_choices(self, region, category, country, excluded_countries=frozenset(), excluded_items=frozenset()):
+        '''Returns how many wrong answers a question about country can be offered in either format: the fewer of its distractors not in excluded_countries and its distractor items not in excluded_items.'''
+        countries = sum(1 for candidate in self.get_distractors(region, category, country) if candidate not in excluded_countries)
+        items = sum(1 for item in self.get_distractor_items(region, category, country)[0] if item not in excluded_items)
+        return min(countries, items)
+
+    def get_capacity(self, region, categories, wrong_choices=3, excluded_countries=frozenset(), excluded_items=frozenset()):
+        '''Returns how many questions in a row a game of region and categories, a category or a tuple of them, is sure to be able to ask with wrong_choices wrong answers each, never counting excluded_countries and excluded_items, up to CAPACITY_CAP. Built once per combination.'''
+        if type(categories) != tuple:
+            categories = (categories,)
+        key = (region, categories, wrong_choices, excluded_countries, excluded_items)
+
+        def build():
+            # Every question needs its own country and item, and its wrong answers are unused distractors or unused distractor items, see spare_choices. Each earlier question uses up at most one of either, so by the k-th question a country needs wrong_choices + k - 1 spare choices, and k questions are possible if the countries with that many can be matched to k distinct items. Question.draw_answer_pair skips countries by the same rule.
+            # (category, country) -> spare choices left after the excluded ones; country -> the (category, item, spare) answers it can have
+            spare = {}
+            answers = {}
+            for category in categories:
+                for country, item in self.get_answer_pairs(region, category):
+                    if country in excluded_countries or item in excluded_items:
+                        continue
+                    if (category, country) not in spare:
+                        spare[(category, country)] = self.spare_choices(region, category, country, excluded_countries, excluded_items)
+                    answers.setdefault(country, []).append((category, item, spare[(category, country)]))
+
+            def matched(k):
+                # whether k countries can be matched to distinct items, by Kuhn's augmenting paths on the country -> item graph, stopping as soon as k are matched
+                graph = {}
+                for country, options in answers.items():
+                    items = [(category, item) for category, item, choices in options if choices >= wrong_choices + k - 1]
+                    if items:
+                        graph[country] = items
+                owner = {}
+
+                def augment(country, visited):
+                    for item in graph[country]:
+                        if item not in visited:
+                            visited.add(item)
+                            if item not in owner or augment(owner[item], visited):
+                                owner[item] = country
+                                return True
+                    return False
+                size = 0
+                for country in graph:
+                    if augment(country, set()):
+                        size += 1
+                        if size >= k:
+                            return True
+                return False
+            # more questions need more spare choices, so matched(k) only turns false as k grows, and the largest k it holds for is found by binary search
+            low = 0
+            high = self.CAPACITY_CAP
+            while low < high:
+                middle = (low + high + 1) // 2
+                if matched(middle):
+                    low = middle
+                else:
+                    high = middle - 1
+            if len(categories) > 1:
+                # games pick each question's category at random, so several categories can't support more questions than the weakest of them alone
+                low = min([low] + [self.get_capacity(region, category, wrong_choices, excluded_countries, excluded_items)
+                                   for category in categories])
+            return low
+        return self.cached(self.capacities, key, build)
+
+    def get_fuzzy_index(self, category):
+        '''Returns the FuzzyIndex that typed answers are matched against: every item of category, or every country for "country". Built on first use.'''
+        def build():
+            if category == "country":
+                return FuzzyIndex(self.items['major region'])
+            return FuzzyIndex(self.countries[category])
+        return self.cached(self.fuzzy_indexes, category, build)
+
+
+class Data(QuestionIndexes):
     JSON_FILES = {
         # Keys of this dictionary match those used in the country-json file indicated by the path value.
         "location": r'./country-json/src/country-by-region-in-world.json',
@@ -38,97 +209,279 @@ class Data:
         'dish': "dishes"
     }
 
-    def __init__(self):
-        self.items = {
-            'major region': {},
-            'minor region': {},
-            'capital': {},
-            'languages': {},
-            'dishes': {}
-        }
-
-        self.countries = {
-            'major region': {'World': []},
-            'minor region': {},
-            'capital': {},
-            'languages': {},
-            'dishes': {}
-        }
-
-        self.raw_data = self.set_raw_data()
-        self.main()
-
-    def set_raw_data(self):
-        '''Collects the contents of JSON files into a dictionary of raw data'''
+    # the reverse of TOPICS: which raw data topic each key of the two main dictionaries is built from
+    RAW_TOPICS = {
+        'major region': "location",
+        'minor region': "location",
+        'capital': "city",
+        'languages': "languages",
+        'dishes': "dish"
+    }
+
+    # the categories that questions can be asked about
+    QUESTION_TOPICS = ("capital", "languages", "dishes")
+
+    JUNK_ITEMS = {
+        # fragments left by stray commas and bad splits in the source data, dropped when it is loaded
+        "", "S", "its Thai name)"
+    }
+
+    def __init__(self, use_snapshot=True, preload=()):
+        # Both main dictionaries load each topic the first time it is looked up, so a game that only plays 'Capital Cities' never parses the languages or dishes files. Pass topic keys in preload to load them straight away.
+        self.items = TopicDict(self, self.RAW_TOPICS)
+        self.countries = TopicDict(self, self.RAW_TOPICS)
+
+        self.set_indexes()
         self.raw_data = {}
-        for topic in self.JSON_FILES:
-            # adjust filepath for OS
-            filepath = os.path.relpath(
-                self.JSON_FILES[topic].replace('\\', os.sep))
-            self.raw_data[topic] = json.load(
-                open(filepath, encoding='utf-8'))
+        # raw topic -> what normalization changed when the topic was processed, see process_raw_data
+        self.reports = {}
+        self.use_snapshot = use_snapshot
+        # loading happens on first access, which may come from several threads at once
+        self.lock = threading.RLock()
+        for topic in preload:
+            self.items[topic]
+
+    @classmethod
+    def get_filepath(cls, topic):
+        '''Returns the path of the JSON file for a raw data topic, adjusted for OS'''
+        return os.path.relpath(cls.JSON_FILES[topic].replace('\\', os.sep))
+
+    def load_topic(self, topic):
+        '''Loads the raw data topic that the items and countries key topic is built from, and fills in every key built from it. A compiled snapshot of the cleaned dictionaries and their cleaning report is used when it matches the JSON file on disk. Otherwise the JSON is parsed and cleaned, and the snapshot rebuilt for the next start.'''
+        raw_topic = self.RAW_TOPICS[topic]
+        with self.lock:
+            if dict.__contains__(self.items, topic):
+                # another thread loaded it while this one waited
+                return
+            snapshot = Snapshot(raw_topic) if self.use_snapshot else None
+            section = snapshot.load(self) if snapshot else None
+            if section is None:
+                self.set_raw_data(raw_topic)
+                section = self.process_raw_data(raw_topic)
+                if raw_topic == "location":
+                    items, countries, report = section
+                    major_items, major_countries = self.set_major_regions(items['minor region'])
+                    items['major region'] = major_items
+                    countries['major region'] = major_countries
+                if snapshot:
+                    snapshot.save(self, section)
+            items, countries, report = section
+            self.reports[raw_topic] = report
+            # countries first, so a thread that sees the topic in items also finds it in countries
+            for key in countries:
+                dict.__setitem__(self.countries, key, countries[key])
+            for key in items:
+                dict.__setitem__(self.items, key, items[key])
+
+    def set_raw_data(self, topic=None):
+        '''Collects the contents of JSON files into a dictionary of raw data. Reads only the file for topic if one is given.'''
+        for raw_topic in ([topic] if topic else self.JSON_FILES):
+            with open(self.get_filepath(raw_topic), encoding='utf-8') as f:
+                self.raw_data[raw_topic] = json.load(f)
         return self.raw_data
 
-    def split_list(self, items):
-        '''Currently used for dishes, which come in as individual strings that sometimes represents as comma seperated list'''
-        if items == None:
-            item_list = None
-        else:
-            split_result = items.split(',')
-        if type(split_result) is str:
-            item_list = [split_result]
-        elif type(split_result) is list:
-            item_list = [item.strip() for item in split_result]
-        else:
-            print("unexpected input to split_list!", items)
-            item_list = None
-        return item_list
-
-    def process_raw_data(self):
-        '''Does most of the work of translating the raw data from country-json into the two main dictionaries of countries and items.'''
-        for item_key in self.raw_data:
-            topic = self.TOPICS[item_key]
-            for item_data in self.raw_data[item_key]:
-                country = item_data['country']
-                items = item_data[item_key]
+    def split_items(self, items):
+        '''Splits a string listing several items, as the dishes file does, on the commas that are not inside parentheses, so "Dish (with rice, or noodles)" stays one item.'''
+        parts = []
+        depth = 0
+        start = 0
+        for position, character in enumerate(items):
+            if character == "(":
+                depth += 1
+            elif character == ")":
+                depth = max(0, depth - 1)
+            elif character == "," and depth == 0:
+                parts.append(items[start:position])
+                start = position + 1
+        parts.append(items[start:])
+        return parts
+
+    def normalize_items(self, country, items, topic, report, existing=()):
+        '''Returns the cleaned list of one country's items: split if they came as one string, trimmed, without JUNK_ITEMS and without duplicates, including the ones in existing. Every change is noted in report.'''
+        if type(items) == str:
+            if topic == "dishes":
+                items = self.split_items(items)
+                if len(items) > 1:
+                    report['split'] += 1
+                    # spaces after the commas are expected, not worth reporting
+                    items = [item.strip() for item in items]
+            else:
+                items = [items]
+        cleaned = []
+        for item in items:
+            stripped = item.strip()
+            if stripped != item:
+                report['trimmed'] += 1
+            if stripped in self.JUNK_ITEMS:
+                report['dropped junk'].append([country, item])
+            elif stripped in cleaned or stripped in existing:
+                report['dropped duplicates'].append([country, stripped])
+            else:
+                cleaned.append(stripped)
+        return cleaned
+
+    def process_raw_data(self, item_key):
+        '''Does most of the work of translating the raw data of one country-json file into its part of the two main dictionaries of items and countries. This is the only place raw data is cleaned: items are normalized by normalize_items, and a country listed more than once gets the items of every listing. Returns an (items, countries, report) tuple, with the dictionaries keyed by topic and a report of what cleaning changed.'''
+        topic = self.TOPICS[item_key]
+        topic_items = {}
+        topic_countries = {}
+        report = {'split': 0, 'trimmed': 0, 'merged countries': [], 'dropped junk': [], 'dropped duplicates': []}
+        for item_data in self.raw_data[item_key]:
+            country = item_data['country'].strip()
+            items = item_data[item_key]
+            if not items or country in self.EXCLUDED_COUNTRIES:
+                continue
+            if country in topic_items:
+                report['merged countries'].append(country)
+                items = self.normalize_items(country, items, topic, report, topic_items[country])
+                topic_items[country].extend(items)
+            else:
+                items = self.normalize_items(country, items, topic, report)
                 if not items:
                     continue
-                if type(items) == str:
-                    if topic == "dishes":
-                        items = self.split_list(items)
-                    else:
-                        items = [items]
-                if not country in self.EXCLUDED_COUNTRIES:
-                    if country in self.items[topic].keys():
-                        self.items[topic][country].append(items)
-                    else:
-                        self.items[topic][country] = items
-                    for subitem in items:
-                        # make lists of countries that share the same item
-                        if subitem in self.countries[topic].keys():
-                            self.countries[topic][subitem].append(country)
-                        else:
-                            self.countries[topic][subitem] = [country]
-        return self.countries, self.items
-
-    def set_major_regions(self):
-        '''Adds major region data (e.g. Asia, Europe, etc.) to the countries and items dictionaries based on the minor region data provided by country-json (e.g. Southeast Asia, Central Europe)'''
+                topic_items[country] = items
+            for subitem in items:
+                # make lists of countries that share the same item
+                topic_countries.setdefault(subitem, []).append(country)
+        return {topic: topic_items}, {topic: topic_countries}, report
+
+    def set_major_regions(self, minor_region_items):
+        '''Builds the major region data (e.g. Asia, Europe, etc.) for the items and countries dictionaries based on the minor region data provided by country-json (e.g. Southeast Asia, Central Europe). Returns an (items, countries) tuple for the 'major region' key.'''
+        major_items = {}
+        major_countries = {'World': []}
         for major_region in self.REGIONS:
             # create an empty list for each major region
-            self.countries['major region'][major_region] = []
-        for country in self.items['minor region']:
-            self.countries['major region']['World'].append(country)
-            minor_region = self.items['minor region'][country][0]
+            major_countries[major_region] = []
+        for country in minor_region_items:
+            major_countries['World'].append(country)
+            minor_region = minor_region_items[country][0]
             for major_region in self.REGIONS:
                 if minor_region in self.REGIONS[major_region]:
-                    self.countries['major region'][major_region].append(
-                        country)
-                    self.items['major region'][country] = [major_region]
-        return self.countries, self.items
+                    major_countries[major_region].append(country)
+                    major_items[country] = [major_region]
+        return major_items, major_countries
+
+    def cleaning_report(self):
+        '''Returns a readable summary of what normalization changed in every loaded raw data topic.'''
+        lines = []
+        for raw_topic, report in self.reports.items():
+            lines.append(f"{raw_topic}: split {report['split']} entries into several items, trimmed {report['trimmed']} items")
+            if report['merged countries']:
+                lines.append("  merged repeated countries: " + ", ".join(report['merged countries']))
+            for name in ('dropped junk', 'dropped duplicates'):
+                for country, item in report[name]:
+                    lines.append(f"  {name}: {item!r} ({country})")
+        return "\n".join(lines)
 
     def main(self):
-        self.process_raw_data()
-        self.set_major_regions()
+        '''Loads every topic straight away.'''
+        for topic in self.RAW_TOPICS:
+            self.items[topic]
+
+
+class DataReloader:
+    '''Keeps an up to date Data object for long-running processes. A background thread polls the country-json files and EXCLUDED_COUNTRIES; when either changes, a new Data object is fully loaded on that thread and then swapped in as self.current with a single assignment. Nothing is ever changed in a Data object that is in use, so code that takes self.current once, e.g. a Game when it starts, sees one consistent version until it is done, while new games get the new version.'''
+
+    def __init__(self, interval=5, use_snapshot=True) -> None:
+        self.interval = interval
+        self.use_snapshot = use_snapshot
+        self.version = 1
+        self.last_error = None
+        self.stamp = self.source_stamp()
+        self.current = self.build()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def build(self):
+        '''Returns a new Data object with every topic loaded. Lazy loading is not used here, since a topic loaded later could come from a newer file than the rest.'''
+        data = Data(self.use_snapshot)
+        data.main()
+        return data
+
+    def source_stamp(self):
+        '''Returns a value that changes whenever a source file or EXCLUDED_COUNTRIES changes.'''
+        stamp = [tuple(sorted(Data.EXCLUDED_COUNTRIES))]
+        for topic in Data.JSON_FILES:
+            try:
+                stat = os.stat(Data.get_filepath(topic))
+                stamp.append((topic, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append((topic, None, None))
+        return tuple(stamp)
+
+    def check(self):
+        '''Reloads if anything changed since the last successful load. Returns True if a new version was swapped in.'''
+        stamp = self.source_stamp()
+        if stamp == self.stamp:
+            return False
+        try:
+            data = self.build()
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            # e.g. a file caught half written, keep serving the current version and try again next time
+            self.last_error = error
+            return False
+        self.stamp = stamp
+        self.current = data
+        self.version += 1
+        self.last_error = None
+        return True
+
+    def start(self):
+        '''Starts polling on a daemon thread.'''
+        self.stop_event.clear()
+
+        def run():
+            while not self.stop_event.wait(self.interval):
+                self.check()
+        self.thread = threading.Thread(target=run, name="data-reloader", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+
+class TopicDict(dict):
+    '''Dictionary of topic keys used for Data.items and Data.countries. A topic is loaded by its Data object the first time it is looked up, after which lookups are ordinary dict lookups. Every topic is listed by keys() and iteration whether loaded or not.'''
+
+    def __init__(self, data, topics) -> None:
+        super().__init__()
+        self.data = data
+        self.topics = tuple(topics)
+
+    def __missing__(self, topic):
+        if topic not in self.topics:
+            raise KeyError(topic)
+        self.data.load_topic(topic)
+        return dict.__getitem__(self, topic)
+
+    def __contains__(self, topic):
+        return topic in self.topics
+
+    def __iter__(self):
+        return iter(self.topics)
+
+    def __len__(self):
+        return len(self.topics)
+
+    def keys(self):
+        return list(self.topics)
+
+    def values(self):
+        return [self[topic] for topic in self.topics]
+
+    def items(self):
+        return [(topic, self[topic]) for topic in self.topics]
+
+    def get(self, topic, default=None):
+        return self[topic] if topic in self.topics else default
+
+    def loaded(self):
+        '''Returns the topics that have been loaded so far.'''
+        return [topic for topic in self.topics if dict.__contains__(self, topic)]
 
 
 if __name__ == "__main__":
@@ -141,3 +494,5 @@ if __name__ == "__main__":
     print("\nCOUNTRIES dictionary contains records for the following numbers of items:")
     for key in data.countries.keys():
         print(key+":", len(data.countries[key]))
+    print("\nCleaning applied to the source data:")
+    print(data.cleaning_report())
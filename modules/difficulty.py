@@ -0,0 +1,77 @@
+import array
+import threading
+from modules.hashing import hash_positions
+
+
+class CountMinSketch:
+    '''Approximate counters for a key space too large to count exactly, in a fixed depth x width table. Each key increments one counter per row, and its count is the smallest of those counters, which can overestimate but never underestimate.'''
+
+    def __init__(self, width=4096, depth=4) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = array.array("I", bytes(4 * width * depth))
+
+    def slots(self, key):
+        '''Returns the position of key's counter in each row. key is a tuple of strings; the same answers always give the same counts, so replays pick the same questions.'''
+        return [row * self.width + position for row, position in enumerate(hash_positions(repr(key), self.depth, self.width))]
+
+    def add(self, key, count=1):
+        table = self.table
+        for slot in self.slots(key):
+            table[slot] += count
+
+    def __getitem__(self, key):
+        table = self.table
+        return min(table[slot] for slot in self.slots(key))
+
+
+class DifficultyStats:
+    '''Running accuracy of questions and distractors, updated as answers come in. Every question, keyed by its format, country and item, has exact counters of times asked and answered wrongly; the question space is fixed by the data, so these stay bounded. Distractor pairs, a correct country with a wrong country offered alongside it, are far more numerous and are counted in count-min sketches of fixed size. Each answer costs a constant number of counter updates and nothing is ever recomputed. Rates are smoothed towards a prior, so rarely asked questions are not judged on a handful of answers.'''
+    # questions with no answers yet count as this hard, with the weight of PRIOR_ANSWERS answers
+    PRIOR_DIFFICULTY = 0.5
+    PRIOR_ANSWERS = 2
+    # candidates compared when selecting for a target difficulty
+    CHOICES = 2
+
+    def __init__(self, sketch_width=4096, sketch_depth=4) -> None:
+        # (format, country, item) -> [asked, wrong]
+        self.questions = {}
+        # (category, correct country, distractor country) -> times offered / times chosen
+        self.pairs_offered = CountMinSketch(sketch_width, sketch_depth)
+        self.pairs_chosen = CountMinSketch(sketch_width, sketch_depth)
+        # games on several threads record into the same counters; reads take no lock, a rate a moment out of date does no harm
+        self.lock = threading.Lock()
+
+    def record(self, question):
+        '''Adds the answer to an answered question to the counters.'''
+        country = question.answer_pair['country']
+        key = (question.format, country, question.answer_pair['item'])
+        with self.lock:
+            counter = self.questions.get(key)
+            if counter is None:
+                counter = self.questions[key] = [0, 0]
+            counter[0] += 1
+            if not question.answered_correctly:
+                counter[1] += 1
+            if question.user_text is not None:
+                # no choices were offered in free-text mode
+                return
+            for letter, distractor in question.wrong_countries.items():
+                pair = (question.category, country, distractor)
+                self.pairs_offered.add(pair)
+                if letter == question.user_choice:
+                    self.pairs_chosen.add(pair)
+
+    def question_difficulty(self, question_format, country, item):
+        '''Returns the smoothed share of wrong answers to a question, from 0 (always answered correctly) to 1.'''
+        asked, wrong = self.questions.get((question_format, country, item), (0, 0))
+        return (wrong + self.PRIOR_DIFFICULTY * self.PRIOR_ANSWERS) / (asked + self.PRIOR_ANSWERS)
+
+    def distractor_confusion(self, category, country, distractor, choices=3):
+        '''Returns the smoothed share of the times a distractor country was offered with country in which players chose it. The prior spreads PRIOR_DIFFICULTY evenly over the choices wrong answers.'''
+        pair = (category, country, distractor)
+        prior = self.PRIOR_DIFFICULTY / choices
+        offered = self.pairs_offered[pair]
+        # both counts can be overestimated by collisions, but a pair can't be chosen more often than offered
+        chosen = min(self.pairs_chosen[pair], offered)
+        return (chosen + prior * self.PRIOR_ANSWERS) / (offered + self.PRIOR_ANSWERS)
@@ -0,0 +1,65 @@
+class QuestionFormat:
+    '''One way of asking about a category, keyed by (stated, choices) like Question.format: what the question text states and what the multiple choice options are. The question text template is compiled into a bound str.format once, when the format is registered.'''
+
+    def __init__(self, category, stated, choices, text) -> None:
+        self.category = category
+        self.key = (stated, choices)
+        # keys of Question.answer_pair for the stated value and the correct choice
+        self.stated_key = "country" if stated == "country" else "item"
+        self.answer_key = "country" if choices == "country" else "item"
+        self.choices_are_countries = choices == "country"
+        self.render_text = text.format
+
+    def question_text(self, answer_pair):
+        return self.render_text(answer_pair[self.stated_key])
+
+
+class CategoryFormats:
+    '''Both question formats of a category, plus the templates of the feedback statement listing a country's correct items. multiple_statement, if given, is used instead of statement when a country has more than one item.'''
+
+    def __init__(self, category, ask_item, ask_country, statement, multiple_statement=None) -> None:
+        self.category = category
+        # in the order Question.set_format picks them: 0 states the country, 1 states the item
+        self.formats = (
+            QuestionFormat(category, "country", category, ask_item),
+            QuestionFormat(category, category, "country", ask_country)
+        )
+        self.render_statement = statement.format
+        self.render_multiple_statement = (multiple_statement or statement).format
+
+    def correct_items_statement(self, country, items, item_list):
+        if len(items) > 1:
+            return self.render_multiple_statement(country=country, items=item_list)
+        return self.render_statement(country=country, items=item_list)
+
+
+# category -> CategoryFormats, and (stated, choices) -> QuestionFormat for every registered category
+CATEGORIES = {}
+FORMATS = {}
+
+
+def register_category(category, ask_item, ask_country, statement, multiple_statement=None):
+    '''Adds the question formats of a category. ask_item is the question text asking for an item of the stated country, ask_country the one asking for the country of the stated item; both have a single {} placeholder. The statements use {country} and {items}.'''
+    formats = CategoryFormats(category, ask_item, ask_country, statement, multiple_statement)
+    CATEGORIES[category] = formats
+    for question_format in formats.formats:
+        FORMATS[question_format.key] = question_format
+    return formats
+
+
+register_category(
+    "capital",
+    "What is the capital of {}?",
+    "{} is the capital of which country?",
+    "{items} is the capital of {country}.")
+register_category(
+    "languages",
+    "Which language is more commonly spoken in {}?",
+    "{} is a language most commonly spoken in which country?",
+    "The major languages spoken in {country} are: {items}")
+register_category(
+    "dishes",
+    "Which food is considered a typical dish in {}?",
+    "{} is a dish most typical of which country?",
+    "The national dish of {country} is {items}.",
+    "The typical national dishes of {country} include: {items}")
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+from collections import Counter
+from itertools import chain
+
+NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    '''Folds text for matching: accents are removed, case is folded, punctuation becomes spaces and runs of spaces are collapsed, so "São Tomé" and "sao tome" are the same.'''
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return NON_ALPHANUMERIC.sub(" ", text.casefold()).strip()
+
+
+def trigrams(normalized):
+    '''Returns the set of three letter substrings of a normalized string, padded so the start and end of the string count for more.'''
+    padded = f"  {normalized} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    '''Trigram index over a vocabulary of names, e.g. every capital, for matching typed answers. Each name is indexed in normalized form, plus its alternate spellings: without text in parentheses and without a leading "the". A search looks up an exact normalized match first, and otherwise only scores the names that share a trigram with the text, by Dice similarity of their trigram sets.'''
+    MIN_SIMILARITY = 0.5
+    PARENTHESES = re.compile(r"\s*\([^)]*\)?")
+
+    def __init__(self, names) -> None:
+        self.keys = []       # normalized spelling per id
+        self.originals = []  # names with that spelling per id
+        self.sizes = []      # trigram count per id
+        self.ids = {}        # normalized spelling -> id
+        self.postings = {}   # trigram -> list of ids
+        for name in names:
+            for spelling in self.spellings(name):
+                self.add(spelling, name)
+
+    def spellings(self, name):
+        spellings = {normalize(name), normalize(self.PARENTHESES.sub("", name))}
+        for spelling in list(spellings):
+            if spelling.startswith("the "):
+                spellings.add(spelling[4:])
+        spellings.discard("")
+        return spellings
+
+    def add(self, spelling, name):
+        key_id = self.ids.get(spelling)
+        if key_id is None:
+            key_id = self.ids[spelling] = len(self.keys)
+            self.keys.append(spelling)
+            self.originals.append([])
+            grams = trigrams(spelling)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(key_id)
+        if name not in self.originals[key_id]:
+            self.originals[key_id].append(name)
+
+    def search(self, text):
+        '''Returns a (names, similarity) tuple with the names whose spelling is most similar to text, from 0 to 1, or ((), 0) if nothing is similar enough.'''
+        spelling = normalize(text)
+        key_id = self.ids.get(spelling)
+        if key_id is not None:
+            return (tuple(self.originals[key_id]), 1.0)
+        grams = trigrams(spelling) if spelling else set()
+        # counting the chained posting lists runs in C, so names sharing many trigrams cost little
+        shared = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        best_id = None
+        best = 0.0
+        sizes = self.sizes
+        size = len(grams)
+        for key_id, count in shared.items():
+            similarity = 2 * count / (size + sizes[key_id])
+            if similarity > best:
+                best_id = key_id
+                best = similarity
+        if best_id is None or best < self.MIN_SIMILARITY:
+            return ((), 0.0)
+        return (tuple(self.originals[best_id]), best)
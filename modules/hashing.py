@@ -0,0 +1,15 @@
+import hashlib
+
+
+def stable_hash(text):
+    '''Returns a 64 bit hash of a string that is stable between processes, unlike hash(), so it can be stored or compared across runs.'''
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hash_positions(text, count, size):
+    '''Returns count positions below size for a string, by double hashing with the two halves of its stable_hash.'''
+    digest = stable_hash(text)
+    first = digest & 0xFFFFFFFF
+    # odd, so the positions don't repeat early when size is a power of two
+    second = digest >> 32 | 1
+    return [(first + i * second) % size for i in range(count)]
@@ -0,0 +1,85 @@
+import mmap
+import array
+import marshal
+import struct
+from modules.compact import StringTable
+from modules.atomic import atomic_write
+
+# header length and start of the body, which follows the header aligned to 4 bytes
+PRELUDE = struct.Struct("<II")
+
+
+class LayoutWriter:
+    '''Writes a file that LayoutReader maps read-only: a magic string, a marshalled layout header and a body of arrays and blobs, each padded to 4 bytes so it can be cast in place. Positions in the layout are relative to the body, which starts after the header.'''
+
+    def __init__(self, magic) -> None:
+        self.magic = magic
+        self.parts = []
+        self.length = 0
+
+    def add(self, part):
+        '''Adds an array or bytes to the body and returns its position.'''
+        position = self.length
+        self.parts.append(part)
+        length = memoryview(part).nbytes
+        self.length += length + (-length % 4)
+        return position
+
+    def add_table(self, table):
+        '''Adds a StringTable and returns its (offsets position, offsets count) entry for LayoutReader.table.'''
+        blob_position = self.add(table.blob)
+        # string offsets are written as positions in the whole file, so the mapping itself serves as every table's blob
+        offsets_position = self.length
+        self.parts.append((blob_position, table.offsets))
+        self.length += len(table.offsets) * 4
+        return (offsets_position, len(table.offsets))
+
+    def write(self, path, layout):
+        '''Writes the file to path with layout as its header. Any file already at path is replaced atomically, so processes that map it are not disturbed.'''
+        header = marshal.dumps(layout)
+        body_start = len(self.magic) + PRELUDE.size + len(header)
+        body_start += -body_start % 4
+        with atomic_write(path) as f:
+            f.write(self.magic)
+            f.write(PRELUDE.pack(len(header), body_start))
+            f.write(header)
+            f.write(b"\0" * (body_start - f.tell()))
+            for part in self.parts:
+                if type(part) == tuple:
+                    blob_position, offsets = part
+                    part = array.array("i", (body_start + blob_position + offset for offset in offsets))
+                raw = bytes(part)
+                f.write(raw + b"\0" * (-len(raw) % 4))
+
+
+class LayoutReader:
+    '''Maps a file written by LayoutWriter read-only. Decodes only the layout header; arrays are views cast straight from the mapped pages. Raises ValueError if the file doesn't start with magic, naming the expected kind of file with description.'''
+
+    def __init__(self, path, magic, description) -> None:
+        with open(path, "rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self.mapping
+        if mm[:len(magic)] != magic:
+            mm.close()
+            raise ValueError(f"{path} is not {description}")
+        header_length, self.body_start = PRELUDE.unpack_from(mm, len(magic))
+        header_start = len(magic) + PRELUDE.size
+        self.layout = marshal.loads(mm[header_start:header_start + header_length])
+        # every view of the mapping, released by close
+        self.views = [memoryview(mm)]
+
+    def array(self, position, typecode, count):
+        start = self.body_start + position
+        cast = self.views[0][start:start + count * array.array(typecode).itemsize].cast(typecode)
+        self.views.append(cast)
+        return cast
+
+    def table(self, entry):
+        position, count = entry
+        return StringTable(self.mapping, self.array(position, "i", count))
+
+    def close(self):
+        '''Releases every view and closes the mapping. Nothing read from the file can be used afterwards.'''
+        for view in reversed(self.views):
+            view.release()
+        self.mapping.close()
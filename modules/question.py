@@ -1,249 +1,401 @@
+import time
 import random
+from functools import cached_property
+from collections import namedtuple
+from modules.data import InsufficientDataError
+from modules.formats import CATEGORIES
+from modules.stats import STATS
 
 
-class Question:
-    '''Takes a game object as input. Once main properties have been set, the "ask" method poses the question and gets the user's input '''
+def format_item_list(items):
+    '''Takes a list and returns a string formatted for printing.'''
+    if len(items) == 1:
+        return items[0].strip()
+    elif len(items) == 2:
+        return items[0].strip() + " and " + items[1].strip()
+    else:
+        comma_list = ""
+        for item in items[:-1]:
+            comma_list = comma_list+(item.strip()+", ")
+        comma_list = comma_list + "and " + items[-1].strip()
+        return comma_list
+
+
+def correct_items_statement(data, category, country):
+    '''Returns the feedback statement listing every item of country for category, e.g. all its languages.'''
+    raw_items_list = data.items[category][country]
+    return CATEGORIES[category].correct_items_statement(country, raw_items_list, format_item_list(raw_items_list))
+
+
+class Session:
+    '''Holds the state questions are generated from: the data, the region and categories being played, what has already been asked and the random generator. Game extends it with the interactive parts, while on its own it generates questions without any terminal I/O.'''
+    LETTERS = ("A", "B", "C", "D")  # choices given to user for each question
+
+    def __init__(self, data, region=None, categories=None, seed=None) -> None:
+        self.data = data   # The data object that questions are generated from
+        self.region = region
+        self.categories = categories
+        self.question_counter = 1
+        self.used = {
+            # Tracks what's been asked, in order to avoid repeating questions in the same game. Problematic data is cleaned or left out by Data, so a game starts with nothing used.
+            'countries': set(),
+            'items': set()
+        }
+        # category -> (country, item) pairs not yet drawn in this session, see Question.get_answer_pair
+        self.pools = {}
+        # category -> pairs set aside because the user saw them in an earlier game, only drawn once the pool runs out
+        self.deferred = {}
+        # SeenFilter of the user's recent questions from earlier games, or None to ignore history
+        self.seen = None
+        # DifficultyStats that answers are recorded in, and the share of wrong answers questions should be picked for, see Question.get_answer_pair
+        self.difficulty = None
+        self.target_difficulty = None
+        # if True the user types answers instead of picking one of the choices, see Question.answer_text
+        self.free_text = False
+        # Every random choice of the session comes from its own generator, so sessions never share random state between threads, and the same seed replays the same questions. Without a seed one is picked and kept for replay.
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def capacity(self, region, categories):
+        '''Returns how many questions the data can supply for region and categories, starting from what this session has already used. See QuestionIndexes.get_capacity.'''
+        return self.data.get_capacity(region, categories, len(self.LETTERS) - 1,
+                                      frozenset(self.used['countries']), frozenset(self.used['items']))
+
+    def pairs_left(self):
+        '''Returns False once every category played has had its pool of answer pairs drawn empty, see Question.get_answer_pair.'''
+        categories = self.categories if type(self.categories) == tuple else (self.categories,)
+        return any(category not in self.pools or self.pools[category] or self.deferred[category] for category in categories)
+
+    def mark_used(self, question):
+        '''Records the country and item of an asked question so they are not asked again.'''
+        self.used['countries'].add(question.answer_pair['country'])
+        self.used['items'].add(question.answer_pair['item'])
+        if self.seen is not None:
+            self.seen.add(question.answer_pair['country'], question.answer_pair['item'], question.format)
+
+
+class MultipleChoice:
+    '''Answering by letter, shared by Question and the tournament's PlayedQuestion. Classes mixing it in have game, correct_choice, user_choice, answered_correctly, feedback and prompt_text.'''
+    __slots__ = ()
+
+    def answer(self, user_choice) -> str:
+        '''Records the user's choice, which must be one of the game's LETTERS. Updates self.answered_correctly to True or False and returns the response to display.'''
+        self.user_choice = user_choice.upper()
+        self.answered_correctly = self.user_choice == self.correct_choice[0]
+        return self.respond()
+
+    def respond(self) -> str:
+        '''Records the answer in the game's DifficultyStats, if it has one, and returns the response to display.'''
+        if self.game.difficulty is not None:
+            self.game.difficulty.record(self)
+        if self.answered_correctly:
+            return "\nCorrect, you gain a point!\n"
+        return "\nIncorrect!" + self.feedback.looking_for
+
+    def choose_letter(self, testing=False) -> str:
+        '''Gets a letter from the user, asking again until it is one of the game's LETTERS. When testing, a random letter is chosen instead.'''
+        while True:
+            if testing:
+                user_choice = self.game.rng.choice(self.game.LETTERS)
+            else:
+                user_choice = input("\nYour answer? ").upper()
+            if user_choice in self.game.LETTERS:
+                return user_choice
+            print("Invalid input, try again!")
+            print("")
+
+    def ask(self, testing=False):
+        '''Displays the question and answer choices, then gets user input. Updates self.answered_correctly to True or False'''
+        print(self.prompt_text())
+        print(self.answer(self.choose_letter(testing)))
+
+
+class Question(MultipleChoice):
+    '''Takes a game or session object as input. Once main properties have been set, the "ask" method poses the question and gets the user's input '''
 
     def __init__(self, game) -> None:
         self.game = game
         self.number = self.game.question_counter
         if type(self.game.categories) == tuple:
-            self.category = random.choice(self.game.categories)
+            self.category = self.game.rng.choice(self.game.categories)
         else:
             self.category = self.game.categories
+        # counts of rejected candidates by reason, only kept while STATS is enabled
+        self.rejections = None
+        if STATS.enabled:
+            self.generate_instrumented()
+        else:
+            self.format = self.set_format()
+            # "get" because it returns values for wrong_choices to
+            self.answer_pair = self.get_answer_pair()
+            self.question_text = self.set_question_text()
+            self.correct_choice = self.set_correct_choice()
+            self.wrong_choices = self.set_wrong_choices()
+        self.user_choice = None
+        self.user_text = None   # the typed answer in free-text mode
+        self.answered_correctly = None
+
+    def generate_instrumented(self):
+        '''Sets the same properties as __init__, while timing each stage and counting rejected candidates for STATS.'''
+        self.rejections = dict.fromkeys(STATS.REJECTIONS, 0)
+        clock = time.perf_counter
+        start = clock()
         self.format = self.set_format()
-        # "get" because it returns values for wrong_choices to
+        format_done = clock()
         self.answer_pair = self.get_answer_pair()
+        answer_pair_done = clock()
         self.question_text = self.set_question_text()
         self.correct_choice = self.set_correct_choice()
+        text_done = clock()
         self.wrong_choices = self.set_wrong_choices()
-        self.user_choice = None
-        self.answered_correctly = None
-        self.feedback = None
-
-    def format_item_list(self, items):
-        '''Takes a list and returns a string formatted for printing.'''
-        if len(items) == 1:
-            return items[0].strip()
-        elif len(items) == 2:
-            return items[0].strip() + " and " + items[1].strip()
-        else:
-            comma_list = ""
-            for item in items[:-1]:
-                comma_list = comma_list+(item.strip()+", ")
-            comma_list = comma_list + "and " + items[-1].strip()
-            return comma_list
+        distractors_done = clock()
+        STATS.record(self.game.region, self.category, self.rejections, {
+            'format': format_done - start,
+            'answer pair': answer_pair_done - format_done,
+            'text': text_done - answer_pair_done,
+            'distractors': distractors_done - text_done
+        })
 
     def set_format(self) -> tuple:
-        '''Randomly selects an appropriate question format based on self.category. Returns a tuple where the first string what will be stated in the question text, and the second string represents what the multiple choice options will be.'''
-        if random.getrandbits(1) == 0:
-            return(('country', self.category))
-        else:
-            return((self.category, 'country'))
+        '''Randomly selects an appropriate question format based on self.category, and keeps its registered templates in self.template. Returns a tuple where the first string what will be stated in the question text, and the second string represents what the multiple choice options will be.'''
+        self.template = CATEGORIES[self.category].formats[self.game.rng.getrandbits(1)]
+        return self.template.key
+
+    def draw(self, source):
+        '''Removes and returns a random element of the list source. The last element is moved into the drawn slot, so this takes constant time.'''
+        index = self.game.rng.randrange(len(source))
+        drawn = source[index]
+        source[index] = source[-1]
+        source.pop()
+        return drawn
+
+    def targeting_difficulty(self):
+        return self.game.difficulty is not None and self.game.target_difficulty is not None
 
     def get_answer_pair(self) -> dict:
-        '''Returns a dict with a random country from the appropriate region, and a corresponding item of the appropriate category, which can be the basis for a question. Used countries and items are excluded.'''
-        while True:
-            country = random.choice(
-                list(self.game.data.countries['major region'][self.game.region]))
+        '''Returns a dict with a random unused country from the game's region and one of its items in the category.'''
+        # Pairs are drawn without replacement from the game's pool for the category; see draw_answer_pair for the ones dropped as they come up. If the game has a seen filter, pairs the user was asked in this format in recent games are set aside, and only drawn once every fresh pair is used up.
+        pool = self.game.pools.get(self.category)
+        if pool is None:
+            pool = list(self.game.data.get_answer_pairs(
+                self.game.region, self.category))
+            self.game.pools[self.category] = pool
+            self.game.deferred[self.category] = []
+        deferred = self.game.deferred[self.category]
+        pair = self.draw_answer_pair(pool, deferred)
+        if pair is None:
+            raise InsufficientDataError(
+                f"No unused {self.category} questions are left for the region {self.game.region}.")
+        if self.targeting_difficulty():
+            # DifficultyStats.CHOICES pairs are drawn and the one closest to the target is kept, the rest go back in the pool
+            difficulty = self.game.difficulty
+
+            def distance(pair):
+                return abs(difficulty.question_difficulty(self.format, *pair) - self.game.target_difficulty)
+            for _ in range(difficulty.CHOICES - 1):
+                other = self.draw_answer_pair(pool, deferred)
+                if other is None:
+                    break
+                if distance(other) < distance(pair):
+                    pair, other = other, pair
+                pool.append(other)
+        return {
+            'country': pair[0],
+            'item': pair[1]
+        }
+
+    def draw_answer_pair(self, pool, deferred):
+        '''Returns the next usable (country, item) pair for get_answer_pair, or None if there are none left.'''
+        while pool or deferred:
+            from_pool = bool(pool)
+            country, item = self.draw(pool if from_pool else deferred)
             if country in self.game.used['countries']:
+                if self.rejections is not None:
+                    self.rejections['used country'] += 1
                 continue
-            if not country in self.game.data.items[self.category].keys():
-                # Ensures that the chosen country has appropriate item data available
-                continue
-            item = random.choice(
-                self.game.data.items[self.category][country])
             if item in self.game.used['items']:
+                if self.rejections is not None:
+                    self.rejections['used item'] += 1
                 continue
-            break
-        answer_pair = {
-            'country': country,
-            'item': item
-        }
-        return answer_pair
+            if not self.enough_choices(country):
+                # used countries only grow, so the pair can't become usable again
+                if self.rejections is not None:
+                    self.rejections['few distractors'] += 1
+                continue
+            if from_pool and self.game.seen is not None and (country, item, self.format) in self.game.seen:
+                deferred.append((country, item))
+                continue
+            return (country, item)
+        return None
+
+    def enough_choices(self, country):
+        '''Returns True if country has an unused wrong answer for every wrong letter in either format, the rule QuestionIndexes.get_capacity counts countries by, so set_wrong_choices never runs out.'''
+        needed = len(self.game.LETTERS) - 1
+        used = self.game.used
+        data = self.game.data
+        region = self.game.region
+        if (len(data.get_distractors(region, self.category, country)) - len(used['countries']) >= needed
+                and len(data.get_distractor_items(region, self.category, country)[0]) - len(used['items']) >= needed):
+            # enough even if every used country and item were a distractor, without counting
+            return True
+        return data.spare_choices(region, self.category, country, used['countries'], used['items']) >= needed
 
     def set_question_text(self) -> str:
-        '''Create the f-string of the question text based on self.answer_pair'''
-        if self.format == ("country", "capital"):
-            return f"What is the capital of {self.answer_pair['country']}?"
-        elif self.format == ("capital", "country"):
-            return f"{self.answer_pair['item']} is the capital of which country?"
-        elif self.format == ("country", "languages"):
-            return f"Which language is more commonly spoken in {self.answer_pair['country']}?"
-        elif self.format == ("languages", "country"):
-            return f"{self.answer_pair['item']} is a language most commonly spoken in which country?"
-        elif self.format == ("country", "dishes"):
-            return f"Which food is considered a typical dish in {self.answer_pair['country']}?"
-        elif self.format == ("dishes", "country"):
-            return f"{self.answer_pair['item']} is a dish most typical of which country?"
-        else:
-            print("unrecognized question type!!!", self.format)
-            return False
+        '''Renders the question text from the format's template and self.answer_pair'''
+        return self.template.question_text(self.answer_pair)
 
     def set_correct_choice(self) -> tuple:
         '''Assigns a random letter to the correct answer choice. Returns a 2-tuple with the letter and the answer.'''
-        if self.format[1] == "country":
-            return (random.choice(self.game.LETTERS), self.answer_pair['country'])
-        else:
-            return (random.choice(self.game.LETTERS), self.answer_pair['item'])
+        return (self.game.rng.choice(self.game.LETTERS), self.answer_pair[self.template.answer_key])
 
     def set_wrong_choices(self) -> dict:
-        '''Assigns appropriate but incorrect answer choices to all the letter options, except the one which is assigned to the correct answer. Returns a dictionary, where the assigned letter options are the keys, and the values are the choices themselves.'''
-        used_countries = []
-        used_items = []
+        '''Assigns appropriate but incorrect answer choices to all the letter options, except the one which is assigned to the correct answer. Returns a dictionary, where the assigned letter options are the keys, and the values are the choices themselves. Candidates come from the data's precomputed distractors for the correct country, so they never share an item with it. Countries already used in the game are left out when the choices are countries, and items already used when they are items.'''
+        wrong_letters = [
+            letter for letter in self.game.LETTERS if letter != self.correct_choice[0]]
+        data = self.game.data
+        country = self.answer_pair['country']
+        distractors = data.get_distractors(self.game.region, self.category, country)
+        if self.template.choices_are_countries:
+            # (choice, the country behind it) for every unused distractor
+            candidates = [(candidate, candidate) for candidate in distractors if candidate not in self.game.used['countries']]
+        else:
+            # distinct items, so no two choices are the same, each with the position in distractors of the country it was found in
+            items, positions = data.get_distractor_items(self.game.region, self.category, country)
+            candidates = [(item, position) for item, position in zip(items, positions) if item not in self.game.used['items']]
+        if len(candidates) < len(wrong_letters):
+            raise InsufficientDataError(
+                f"Only {len(candidates)} wrong answers are available for {country} in the {self.category} category and {self.game.region} region.")
+
+        def behind(candidate):
+            # the country behind a candidate, only looked up for the few that are compared or kept
+            return candidate[1] if self.template.choices_are_countries else distractors[candidate[1]]
+        if self.targeting_difficulty():
+            difficulty = self.game.difficulty
+            # a question missed target_difficulty of the time has each of its distractors chosen about an even share of that
+            target = self.game.target_difficulty / len(wrong_letters)
+
+            def distance(candidate):
+                return abs(difficulty.distractor_confusion(
+                    self.category, country, behind(candidate), len(wrong_letters)) - target)
         wrong_choices = {}
-        for letter in self.game.LETTERS:
-            if not letter == self.correct_choice[0]:
-                while True:
-                    candidate_pair = self.get_answer_pair()
-                    candidate_country = candidate_pair['country']
-                    candidate_item = candidate_pair['item']
-                    if candidate_country == self.answer_pair['country']:
-                        continue
-                    if candidate_country in used_countries:
-                        continue
-                    for item in self.game.data.items[self.category][candidate_country]:
-                        item_problem = False
-                        # ensure the correct country and the wrong answer's candidate country don't share any relevant items in common.
-                        if item in self.game.data.items[self.category][self.answer_pair['country']]:
-                            item_problem = True
-                            break
-                    if item_problem:
-                        continue
-                    if candidate_item in used_items:
-                        continue
-                    break
-                if self.format[1] == "country":
-                    wrong_choices[letter] = candidate_country
-                else:
-                    wrong_choices[letter] = candidate_item
-                used_countries.append(candidate_country)
-                used_items.append(candidate_item)
+        # the country behind each wrong choice, for DifficultyStats
+        self.wrong_countries = {}
+        for letter in wrong_letters:
+            candidate = self.draw(candidates)
+            if self.targeting_difficulty():
+                for _ in range(difficulty.CHOICES - 1):
+                    if not candidates:
+                        break
+                    other = self.draw(candidates)
+                    if distance(other) < distance(candidate):
+                        candidate, other = other, candidate
+                    candidates.append(other)
+            wrong_choices[letter] = candidate[0]
+            self.wrong_countries[letter] = behind(candidate)
         return wrong_choices
 
-    def ask(self, testing=False):
-        '''Displays the question and answer choices, then gets user input. Updates self.answered_correctly to True or False'''
-        print("\n========================")
-        print("Question", self.number, ":")
-        print(self.question_text+"\n")
+    def get_choices(self) -> dict:
+        '''Returns a dictionary of every answer choice, keyed by letter in the order the letters are displayed.'''
+        choices = {}
         for letter in self.game.LETTERS:
-            # display the options
             if letter == self.correct_choice[0]:
-                print(letter+":", self.correct_choice[1])
-            else:
-                print(letter+":", self.wrong_choices[letter])
-        while True:
-            # get user answer
-            if testing:
-                self.user_choice = random.choice(self.game.LETTERS)
-            else:
-                self.user_choice = input("\nYour answer? ").upper()
-            if not self.user_choice in self.game.LETTERS:
-                print("Invalid input, try again!")
-                print("")
+                choices[letter] = self.correct_choice[1]
             else:
-                break
-        # update status and return
-        if self.user_choice.upper() == self.correct_choice[0]:
-            print("\nCorrect, you gain a point!\n")
-            self.answered_correctly = True
-            self.feedback = Feedback(self)
-        else:
-            print("\nIncorrect!")
-            self.answered_correctly = False
-            self.feedback = Feedback(self)
-            self.feedback.print_looking_for()
+                choices[letter] = self.wrong_choices[letter]
+        return choices
 
-    def set_feedback(self):
-        '''Sets appropriate feedback based on user's result.'''
-        country = self.answer_pair['country']
-        item = self.answer_pair['item']
-        raw_countries_list = self.game.data.countries[self.category][item]
-        raw_items_list = self.game.data.items[self.category][country]
-        countries = self.format_item_list(raw_countries_list)
-        items = self.format_item_list(raw_items_list)
-        if self.category == "capital":
-            self.feedback = f"{items} is the capital of {country}.\n"
-        elif self.category == "languages":
-            self.feedback = f"The major languages spoken in {country} are: {items}\n"
-        elif self.category == "dishes":
-            if len(raw_items_list) > 1:
-                self.feedback = f"The typical national dishes of {country} include: {items}\n"
-            else:
-                self. feedback = f"The national dish of {country} is {item}."
-        else:
-            self.feedback = "Category not implemented! " + self.category
-        if self.answered_correctly:
-            if len(raw_items_list) > 1:
-                if self.format[1] == "country":
-                    self.feedback += f"\nYour answer {self.answer_pair['country']} was correct."
-                else:
-                    self.feedback += f"\nYour answer {self.answer_pair['item']} was correct."
+    @property
+    def feedback(self):
+        '''Feedback statements for the question. Built on each use rather than kept, so a question never refers back to itself and is freed as soon as the game is done with it.'''
+        return Feedback(self)
+
+    def to_record(self) -> dict:
+        '''Returns the question as a plain dictionary that can be serialized, e.g. as JSON, and presented by another front end.'''
+        feedback = Feedback(self)
+        return {
+            'number': self.number,
+            'region': self.game.region,
+            'category': self.category,
+            'format': list(self.format),
+            'country': self.answer_pair['country'],
+            'item': self.answer_pair['item'],
+            'text': self.question_text,
+            'choices': self.get_choices(),
+            'correct': self.correct_choice[0],
+            'feedback': {
+                'correct_items': feedback.correct_items_statement,
+                'looking_for': feedback.looking_for.strip()
+            }
+        }
+
+    def prompt_text(self) -> str:
+        '''Returns the question number, text and answer choices as they are displayed to the user.'''
+        lines = ["\n========================",
+                 f"Question {self.number} :", self.question_text+"\n"]
+        if self.game.free_text:
+            return "\n".join(lines)
+        for letter, choice in self.get_choices().items():
+            # display the options
+            lines.append(letter+": "+choice)
+        return "\n".join(lines)
+
+    def acceptable_answers(self):
+        '''Returns every answer that counts as correct: all the countries with the stated item, or all the items of the stated country.'''
+        if self.template.choices_are_countries:
+            return self.game.data.countries[self.category][self.answer_pair['item']]
+        return self.game.data.items[self.category][self.answer_pair['country']]
+
+    def answer_text(self, text) -> str:
+        '''Free-text counterpart of answer: text is matched to the most similar answer in the data, allowing for typos and accents, and is correct if that answer is acceptable. Matching the whole vocabulary rather than just the acceptable answers means a close but different answer, e.g. another country's capital, is not accepted. Updates self.answered_correctly to True or False and returns the response to display.'''
+        self.user_text = text.strip()
+        index_key = "country" if self.template.choices_are_countries else self.category
+        matches, similarity = self.game.data.get_fuzzy_index(index_key).search(self.user_text)
+        acceptable = self.acceptable_answers()
+        self.answered_correctly = any(match in acceptable for match in matches)
+        return self.respond()
+
+    def ask(self, testing=False):
+        '''Displays the question and answer choices, then gets user input, typed rather than chosen by letter in free-text mode. Updates self.answered_correctly to True or False'''
+        if not self.game.free_text:
+            super().ask(testing)
+            return
+        print(self.prompt_text())
+        if testing:
+            text = self.game.rng.choice(list(self.get_choices().values()))
         else:
-            # If user answered incorrectly, feedback statement requires further customization.
-            if self.format[1] == "country":
-                looking_for_statement = f"The answer we were looking for was {self.answer_pair['country']}.\n"
-            else:
-                looking_for_statement = f"The answer we were looking for was {self.answer_pair['item']}.\n"
-            wrong_item_statement = f"\n\nYou said {self.wrong_choices[self.user_choice]}"
-            if self.format == ("country", "capital"):
-                self.feedback = f"The capital of {country} is {items}." + \
-                    wrong_item_statement
-            elif self.format == ("capital", "country"):
-                self.feedback += wrong_item_statement
-            elif self.format == ("country", "languages"):
-                self.feedback += wrong_item_statement + looking_for_statement
-            elif self.format == ("languages", "country"):
-                self.feedback = looking_for_statement + wrong_item_statement + \
-                    f"\n{self.answer_pair['item']} is most commonly spoken in: {countries}"
-            elif self.format == ("country", "dishes"):
-                self.feedback = looking_for_statement + wrong_item_statement + self.feedback
-            elif self.format == ("dishes", "country"):
-                self.feedback = looking_for_statement + wrong_item_statement + \
-                    f"\n{self.answer_pair['item']} is considered a national dish in: {countries}"
-        return
+            text = input("\nYour answer? ")
+        print(self.answer_text(text))
 
 
 class Feedback():
+    '''Feedback statements for an answered question. Each statement is rendered from the question format's templates the first time it is read, so questions whose detailed report is skipped never build them.'''
+
     def __init__(self, question) -> None:
         self.q = question
         self.game = self.q.game
-        self.correct_items_statement = self.set_correct_items_statement()
-        self.you_said = self.set_you_said()
-        self.looking_for = self.set_looking_for()
-        if not self.q.answered_correctly:
-            self.wrong_item_statement = self.set_wrong_item_statement()
 
-    def set_you_said(self):
-        if self.q.answered_correctly:
-            return f"You said {self.q.correct_choice[1]}"
-        else:
-            return f"You said {self.q.wrong_choices[self.q.user_choice]}"
+    @cached_property
+    def you_said(self):
+        if self.q.user_text is not None:
+            return f"You said {self.q.user_text}"
+        if self.q.user_choice is None:
+            # question has not been answered yet, e.g. when generating records
+            return None
+        return f"You said {self.q.get_choices()[self.q.user_choice]}"
 
-    def set_looking_for(self):
-        if self.q.format[1] == "country":
-            return f"\nThe answer we were looking for was {self.q.answer_pair['country']}."
-        else:
-            return f"\nThe answer we were looking for was {self.q.answer_pair['item']}."
-
-    def set_correct_items_statement(self):
-        country = self.q.answer_pair['country']
-        raw_items_list = self.q.game.data.items[self.q.category][country]
-        items = self.q.format_item_list(raw_items_list)
-        if self.q.category == "capital":
-            return f"{items} is the capital of {country}."
-        elif self.q.category == "languages":
-            return f"The major languages spoken in {country} are: {items}"
-        elif self.q.category == "dishes":
-            if len(raw_items_list) > 1:
-                return f"The typical national dishes of {country} include: {items}"
-            else:
-                return f"The national dish of {country} is {items}."
-        else:
-            return "Category not implemented! " + self.game.category
+    @cached_property
+    def looking_for(self):
+        return f"\nThe answer we were looking for was {self.q.correct_choice[1]}."
+
+    @cached_property
+    def correct_items_statement(self):
+        return correct_items_statement(self.game.data, self.q.category, self.q.answer_pair['country'])
 
-    def set_wrong_item_statement(self):
-        return f"You said {self.q.wrong_choices[self.q.user_choice]}"
+    @cached_property
+    def wrong_item_statement(self):
+        return self.you_said
 
     def print_looking_for(self):
         if not self.q.answered_correctly:
@@ -256,3 +408,61 @@ class Feedback():
             print(self.wrong_item_statement)
             print(self.looking_for)
             print(self.correct_items_statement)
+
+
+class Result(namedtuple("Result", ("number", "category", "country", "answer", "said", "answered_correctly"))):
+    '''What a game keeps of an answered question for its reports.'''
+    # Only strings, with no reference back to the question or the game, so answered questions are freed as soon as they are recorded instead of waiting on the cycle collector. Feedback statements are rendered from it when a report is shown.
+    __slots__ = ()
+
+    @property
+    def you_said(self):
+        return f"You said {self.said}"
+
+    @property
+    def looking_for(self):
+        return f"\nThe answer we were looking for was {self.answer}."
+
+    def correct_items_statement(self, data):
+        return correct_items_statement(data, self.category, self.country)
+
+
+def question_result(question):
+    '''Returns the Result of an answered Question, or of a tournament PlayedQuestion.'''
+    if question.user_text is not None:
+        said = question.user_text
+    else:
+        said = question.get_choices()[question.user_choice]
+    return Result(question.number, question.category, question.answer_pair['country'],
+                  question.correct_choice[1], said, question.answered_correctly)
+
+
+def generate_questions(data, region, categories, count, seed=None, session_length=10, difficulty=None, target_difficulty=None):
+    '''Yields count question records (see Question.to_record) for region and categories without any terminal I/O.'''
+    # The same seed always yields the same records. A new session is started every session_length questions, or sooner if a session runs out of unused questions, so answers only repeat between sessions, the same as between games. With a DifficultyStats and a target_difficulty, questions and distractors are picked to be missed about target_difficulty of the time.
+    if Session(data).capacity(region, categories) == 0:
+        # fail before starting rather than after drawing every pair
+        raise InsufficientDataError(f"The data can't supply any {categories} questions for the region {region}.")
+    rng = random.Random(seed)
+    session = None
+    generated = 0
+    while generated < count:
+        if session is None or session.question_counter > session_length:
+            session = Session(data, region, categories, rng.getrandbits(64))
+            session.difficulty = difficulty
+            session.target_difficulty = target_difficulty
+        try:
+            question = Question(session)
+        except InsufficientDataError:
+            # a question that fails part way through a session ends it; one that fails at its start only costs its pair
+            if session.question_counter > 1:
+                session = None
+            elif not session.pairs_left():
+                # a new session has drawn every pair without finding a question
+                raise
+            # otherwise the failed pair is gone from the pool and the next one is tried
+            continue
+        session.mark_used(question)
+        session.question_counter += 1
+        generated += 1
+        yield question.to_record()
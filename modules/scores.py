@@ -1,51 +1,241 @@
 import os
+import time
+import contextlib
 import pickle
+import sqlite3
+import urllib.request
+from modules.seen import SeenFilter
+
+
+def categories_key(categories):
+    '''Game categories are either a single category string or a tuple of them. Returns a string that identifies them in the score records.'''
+    if type(categories) == tuple:
+        return ",".join(categories)
+    return categories
+
+
+class ScoreStore:
+    '''Keeps every finished game in a SQLite database. The database runs in WAL mode, so readers never block, and writers from any number of processes wait their turn instead of overwriting each other's records.'''
+    PATH = "scores.db"
+    PICKLE_NAME = "scores.pkl"  # score file used by earlier versions, imported once from the database's folder
+
+    def __init__(self, path=None, timeout=30, read_only=False) -> None:
+        self.path = path or self.PATH
+        if read_only:
+            # An existing database, opened as it is: nothing is created, upgraded or imported, and writes fail. sqlite3.OperationalError if it doesn't exist.
+            uri = "file:" + urllib.request.pathname2url(os.path.abspath(self.path)) + "?mode=ro"
+            self.connection = sqlite3.connect(
+                uri, uri=True, timeout=timeout, isolation_level=None, check_same_thread=False)
+            return
+        # autocommit mode, writes open their own transactions
+        self.connection = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+        self.migrate_pickle()
+
+    def create_tables(self):
+        '''Besides the games themselves, two tables are kept up to date as games are added, so leaderboard queries never rescan the games: best_scores holds each user's best game per region and categories, and score_counts holds how many users have each best score.'''
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS games (
+                id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL,
+                region TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                played_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS games_by_user ON games (username, region, categories, id);
+            CREATE TABLE IF NOT EXISTS best_scores (
+                region TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                username TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                game_id INTEGER NOT NULL,
+                PRIMARY KEY (region, categories, username)
+            );
+            CREATE INDEX IF NOT EXISTS best_scores_by_score ON best_scores (region, categories, score DESC, game_id);
+            CREATE TABLE IF NOT EXISTS score_counts (
+                region TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                players INTEGER NOT NULL,
+                PRIMARY KEY (region, categories, score)
+            );
+            CREATE TABLE IF NOT EXISTS seen (
+                username TEXT PRIMARY KEY,
+                filter BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        ''')
+
+    def update_leaderboards(self, game_id, username, region, categories, score):
+        '''Folds one new game into best_scores and score_counts. Must be called inside a transaction.'''
+        row = self.connection.execute(
+            "SELECT score FROM best_scores WHERE region = ? AND categories = ? AND username = ?",
+            (region, categories, username)).fetchone()
+        if row is not None and row[0] >= score:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO best_scores (region, categories, username, score, game_id) VALUES (?, ?, ?, ?, ?)",
+            (region, categories, username, score, game_id))
+        if row is not None:
+            self.connection.execute(
+                "UPDATE score_counts SET players = players - 1 WHERE region = ? AND categories = ? AND score = ?",
+                (region, categories, row[0]))
+        self.connection.execute(
+            "INSERT INTO score_counts (region, categories, score, players) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (region, categories, score) DO UPDATE SET players = players + 1",
+            (region, categories, score))
+
+    def insert_games(self, rows):
+        '''Inserts (username, region, categories key, score, played_at) rows and updates the leaderboards. Must be called inside a transaction.'''
+        for row in rows:
+            cursor = self.connection.execute(
+                "INSERT INTO games (username, region, categories, score, played_at) VALUES (?, ?, ?, ?, ?)", row)
+            self.update_leaderboards(cursor.lastrowid, *row[:4])
+
+    def migrate_pickle(self, pickle_path=None):
+        '''Imports the records of the old scores.pkl file next to the database the first time the database is opened, so a database elsewhere, e.g. a benchmark's, never picks up the local scores. The pickle only kept high scores, so each one becomes a single game with an unknown date.'''
+        pickle_path = pickle_path or os.path.join(os.path.dirname(self.path), self.PICKLE_NAME)
+        if not os.path.exists(pickle_path):
+            return 0
+        with self.transaction():
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'migrated_pickle'").fetchone():
+                return 0
+            with open(pickle_path, "rb") as f:
+                complete_records = pickle.load(f)
+            rows = set()
+            for username, records in complete_records.items():
+                if username == "all_users":
+                    # record holders are normally in their own records too, but older versions could lose those
+                    for (region, categories), (score, holder) in records.items():
+                        rows.add((holder, region, categories_key(categories), score))
+                else:
+                    for (region, categories), score in records.items():
+                        rows.add((username, region, categories_key(categories), score))
+            self.insert_games(row + (0,) for row in sorted(rows))
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_pickle', ?)", (str(time.time()),))
+        return len(rows)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''Context manager for a write transaction. BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue on the busy timeout rather than failing part way through.'''
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        else:
+            self.connection.execute("COMMIT")
+
+    def add_game(self, username, region, categories, score, played_at=None):
+        '''Records one finished game.'''
+        self.add_games([(username, region, categories, score, played_at)])
+
+    def add_games(self, games):
+        '''Records many finished games in a single transaction. games is an iterable of (username, region, categories, score, played_at) tuples; played_at may be None for the current time.'''
+        now = time.time()
+        rows = [(username, region, categories_key(categories), score, now if played_at is None else played_at)
+                for username, region, categories, score, played_at in games]
+        with self.transaction():
+            self.insert_games(rows)
+
+    def personal_best(self, username, region, categories):
+        '''Returns the user's highest score for the region and categories, or None if they have not played them.'''
+        row = self.connection.execute(
+            "SELECT score FROM best_scores WHERE region = ? AND categories = ? AND username = ?",
+            (region, categories_key(categories), username)).fetchone()
+        return row[0] if row else None
+
+    def record(self, region, categories):
+        '''Returns a (score, username) tuple with the highest score for the region and categories, held by whoever reached it first, or (None, None) if nobody has played them.'''
+        top = self.top_players(region, categories, 1)
+        if not top:
+            return (None, None)
+        username, score = top[0]
+        return (score, username)
+
+    def top_players(self, region, categories, k=10):
+        '''Returns a list of up to k (username, score) tuples with the best players for the region and categories. Ties go to whoever reached the score first.'''
+        return self.connection.execute(
+            "SELECT username, score FROM best_scores WHERE region = ? AND categories = ? ORDER BY score DESC, game_id LIMIT ?",
+            (region, categories_key(categories), k)).fetchall()
+
+    def user_rank(self, username, region, categories):
+        '''Returns a (rank, players) tuple with the user's rank by best score for the region and categories, and the number of players ranked. Users with the same best score share a rank. Returns None if the user has not played them.'''
+        best = self.personal_best(username, region, categories)
+        if best is None:
+            return None
+        # one row per distinct score, so this never grows with the number of games or players
+        above, players = self.connection.execute(
+            "SELECT COALESCE(SUM(CASE WHEN score > ? THEN players ELSE 0 END), 0), COALESCE(SUM(players), 0) "
+            "FROM score_counts WHERE region = ? AND categories = ?",
+            (best, region, categories_key(categories))).fetchone()
+        return (above + 1, players)
+
+    def user_history(self, username, region=None, categories=None):
+        '''Returns a list of (region, categories key, score, played_at) tuples for each game the user has played, oldest first. Optionally limited to one region and categories.'''
+        if region is None:
+            return self.connection.execute(
+                "SELECT region, categories, score, played_at FROM games WHERE username = ? ORDER BY id",
+                (username,)).fetchall()
+        return self.connection.execute(
+            "SELECT region, categories, score, played_at FROM games WHERE username = ? AND region = ? AND categories = ? ORDER BY id",
+            (username, region, categories_key(categories))).fetchall()
+
+    def iter_games(self, since=None):
+        '''Yields a (username, region, categories key, score, played_at) tuple for every game in the order they were recorded, optionally only the ones played at or after since. Rows are read from the database as they are consumed, so the whole history is never held in memory.'''
+        if since is None:
+            cursor = self.connection.execute(
+                "SELECT username, region, categories, score, played_at FROM games ORDER BY id")
+        else:
+            cursor = self.connection.execute(
+                "SELECT username, region, categories, score, played_at FROM games WHERE played_at >= ? ORDER BY id", (since,))
+        # a dedicated cursor, so other queries on the connection don't disturb the scan
+        yield from cursor
+
+    def load_seen(self, username):
+        '''Returns the SeenFilter of questions the user has recently been asked, empty for a new user.'''
+        row = self.connection.execute(
+            "SELECT filter FROM seen WHERE username = ?", (username,)).fetchone()
+        return SeenFilter(row[0] if row else None)
+
+    def save_seen(self, username, seen):
+        '''Stores the user's SeenFilter, replacing the previous one.'''
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR REPLACE INTO seen (username, filter, updated_at) VALUES (?, ?, ?)",
+                (username, seen.to_bytes(), time.time()))
+
+    def close(self):
+        self.connection.close()
 
 
 class Scores:
-    def __init__(self, game) -> None:
+    def __init__(self, game, store=None) -> None:
         self.username = game.username
         self.score = game.score
         self.region = game.region
         self.topic = game.TOPIC_NAMES[game.categories]
         # scores are tracked seperately for each combination of region and topic category
         self.game_pair = (game.region, game.categories)
-        self.complete_records = self.set_raw_score_records()
+        self.seen = game.seen
+        self.store = store or ScoreStore()
         self.personal_best, self.record_holder, self.record_high = self.set_top_records()
-        self.update_records()
-
-    def set_raw_score_records(self):
-        if os.path.exists("scores.pkl"):
-            # attempt to read the file for past records
-            return pickle.load(open("scores.pkl", "rb"))
-        else:
-            return {}
 
     def set_top_records(self):
-        '''Returns a dictionary with only two keys, the current username and the record-holders username. Values are the highest record scores for each of these two users. '''
-        if not self.complete_records == {}:
-            if "all_users" in self.complete_records.keys():
-                # Check for highest score of any user in this game_pair category. Underscores are not allowed in usernames in order to protect the special key, all_users
-                if self.game_pair in self.complete_records["all_users"].keys():
-                    record_high = self.complete_records["all_users"][self.game_pair][0]
-                    record_holder = self.complete_records["all_users"][self.game_pair][1]
-                else:
-                    record_high = None
-                    record_holder = None
-            else:
-                record_high = None
-            if self.username in self.complete_records.keys():
-                # check for highest score of the current user in present game_pair
-                if self.game_pair in self.complete_records[self.username].keys():
-                    user_high = self.complete_records[self.username][self.game_pair]
-                else:
-                    user_high = None
-            else:
-                user_high = None
-        else:
-            user_high = None
-            record_holder = None
-            record_high = None
+        '''Returns the current user's highest score for this game_pair, and the record holder's username and score. Values are None if there is no record yet.'''
+        region, categories = self.game_pair
+        user_high = self.store.personal_best(self.username, region, categories)
+        record_high, record_holder = self.store.record(region, categories)
         return (user_high, record_holder, record_high)
 
     def report_results(self):
@@ -80,28 +270,19 @@ class Scores:
                     print(
                         f"You hold the record score of {self.record_high} points.")
 
+    def report_leaderboard(self, k=5):
+        '''Displays the user's rank and the top players for the region and topic.'''
+        region, categories = self.game_pair
+        rank = self.store.user_rank(self.username, region, categories)
+        if rank:
+            print(f"You are ranked {rank[0]} of {rank[1]} players for this region and topic.")
+        print(f"\nTop players for {self.region} / {self.topic}:")
+        for place, (username, score) in enumerate(self.store.top_players(region, categories, k), 1):
+            print(f"{place}. {username} - {score} points")
+
     def update_records(self):
-        '''Add the results of the current game to the data file if a record was broken.'''
-        if self.personal_best:
-            # user has played this region and topic before
-            if self.score > self.personal_best:
-                self.complete_records[self.username][self.game_pair] = self.score
-        else:
-            # user has not played this region and topic before
-            self.complete_records[self.username] = {}
-            self.complete_records[self.username][self.game_pair] = self.score
-        if self.record_high:
-            if self.score > self.record_high:
-                self.complete_records["all_users"][self.game_pair] = (
-                    self.score, self.username)
-        else:
-            if "all_users" in self.complete_records.keys():
-                self.complete_records["all_users"][self.game_pair] = (
-                    self.score, self.username)
-            else:
-                self.complete_records["all_users"] = {}
-                self.complete_records["all_users"][self.game_pair] = (
-                    self.score, self.username)
-        with open('scores.pkl', 'wb') as f:
-            # update the data file
-            pickle.dump(self.complete_records, f)
+        '''Add the results of the current game to the score records.'''
+        region, categories = self.game_pair
+        self.store.add_game(self.username, region, categories, self.score)
+        if self.seen is not None:
+            self.store.save_seen(self.username, self.seen)
@@ -0,0 +1,48 @@
+from modules.hashing import hash_positions
+
+
+class SeenFilter:
+    '''Compact record of the questions a user has seen recently, kept between games. It is a Bloom filter in two generations of GENERATION_BYTES each: questions are added to the current generation, and once it holds CAPACITY questions it becomes the previous generation and the one before it is dropped. A question therefore counts as seen for between one and two generations' worth of questions, and the whole filter always serializes to 2 + 2 * GENERATION_BYTES bytes. Like any Bloom filter it can report a question it never saw, but never misses one it did.'''
+    GENERATION_BYTES = 128
+    HASHES = 3
+    # questions per generation; with 1024 bits and 3 hashes this keeps false positives around 2%
+    CAPACITY = 100
+    SIZE = GENERATION_BYTES * 8
+
+    def __init__(self, blob=None) -> None:
+        if blob:
+            self.count = int.from_bytes(blob[:2], "little")
+            self.current = bytearray(blob[2:2 + self.GENERATION_BYTES])
+            self.previous = bytearray(blob[2 + self.GENERATION_BYTES:])
+        if not blob or len(self.current) != self.GENERATION_BYTES or len(self.previous) != self.GENERATION_BYTES:
+            # new user, or a filter saved with another size
+            self.count = 0
+            self.current = bytearray(self.GENERATION_BYTES)
+            self.previous = bytearray(self.GENERATION_BYTES)
+
+    def bits(self, country, item, question_format):
+        '''Returns the bit positions of a question.'''
+        return hash_positions(f"{country}\0{item}\0{question_format[0]}\0{question_format[1]}", self.HASHES, self.SIZE)
+
+    def add(self, country, item, question_format):
+        if self.count >= self.CAPACITY:
+            self.previous = self.current
+            self.current = bytearray(self.GENERATION_BYTES)
+            self.count = 0
+        for bit in self.bits(country, item, question_format):
+            self.current[bit >> 3] |= 1 << (bit & 7)
+        self.count += 1
+
+    def __contains__(self, question):
+        '''question is a (country, item, format) tuple.'''
+        bits = self.bits(*question)
+        for generation in (self.current, self.previous):
+            for bit in bits:
+                if not generation[bit >> 3] & (1 << (bit & 7)):
+                    break
+            else:
+                return True
+        return False
+
+    def to_bytes(self):
+        return self.count.to_bytes(2, "little") + bytes(self.current) + bytes(self.previous)
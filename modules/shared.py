@@ -0,0 +1,57 @@
+import os
+import tempfile
+from modules.compact import Adjacency, CompactData
+from modules.mapped import LayoutWriter, LayoutReader
+
+
+class SharedData:
+    '''Publishes a CompactData layout in a single memory-mapped file, so a parent process builds the dataset once and any number of worker processes attach to it read-only. Attaching only decodes a small header: the string tables and id arrays are used straight from the mapped pages, which the operating system shares between every process that maps the file. Every region's distractors are published as id arrays too, so workers never build those indexes themselves. The file goes in /dev/shm when it exists, so it never touches the disk.'''
+    MAGIC = b"GEOSHM01"
+
+    def __init__(self, path) -> None:
+        self.path = path
+
+    @classmethod
+    def publish(cls, data, path=None):
+        '''Writes the compact layout of data to path, or to a new temporary file, and returns a SharedData for it. Call unlink once every worker has attached.'''
+        compact = CompactData.from_data(data)
+        if path is None:
+            folder = "/dev/shm" if os.path.isdir("/dev/shm") else None
+            handle, path = tempfile.mkstemp(prefix="geo-trivia-", suffix=".data", dir=folder)
+            os.close(handle)
+        writer = LayoutWriter(cls.MAGIC)
+
+        def add_adjacency(adjacency):
+            return (writer.add(adjacency.offsets), len(adjacency.offsets),
+                    writer.add(adjacency.targets), len(adjacency.targets))
+
+        layout = {'countries': writer.add_table(compact.country_table), 'topics': {}, 'distractors': {}}
+        for topic, (item_table, country_items, item_countries) in compact.topics.items():
+            layout['topics'][topic] = (writer.add_table(item_table), add_adjacency(country_items), add_adjacency(item_countries))
+        for key, arrays in compact.build_distractor_arrays(data.QUESTION_TOPICS).items():
+            layout['distractors'][key] = tuple(add_adjacency(adjacency) for adjacency in arrays)
+        writer.write(path, layout)
+        return cls(path)
+
+    @classmethod
+    def attach(cls, path):
+        '''Maps the published file read-only and returns a CompactData that reads from it. The mapping stays valid after the file is unlinked.'''
+        reader = LayoutReader(path, cls.MAGIC, "a published dataset")
+
+        def adjacency(entry):
+            offsets_position, offsets_count, targets_position, targets_count = entry
+            return Adjacency(reader.array(offsets_position, "i", offsets_count), reader.array(targets_position, "i", targets_count))
+
+        topics = {}
+        for topic, (item_table, country_items, item_countries) in reader.layout['topics'].items():
+            topics[topic] = (reader.table(item_table), adjacency(country_items), adjacency(item_countries))
+        distractor_arrays = {key: tuple(adjacency(entry) for entry in entries) for key, entries in reader.layout['distractors'].items()}
+        compact = CompactData(reader.table(reader.layout['countries']), topics, distractor_arrays)
+        # keep the mapping alive for as long as the data is
+        compact.mapping = reader.mapping
+        return compact
+
+    def unlink(self):
+        '''Removes the published file. Processes that already attached keep working.'''
+        if os.path.exists(self.path):
+            os.remove(self.path)
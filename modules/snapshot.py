@@ -0,0 +1,96 @@
+import os
+import hashlib
+import marshal
+import mmap
+import struct
+from modules.atomic import atomic_write
+
+
+class Snapshot:
+    '''Compiled copy of the part of a Data object's items and countries dictionaries that is built from one raw data topic, after cleaning, with the report of what cleaning changed. Each snapshot is a binary file that is memory-mapped and decoded with marshal, so a warm start skips the JSON parsing and processing steps entirely.'''
+    PATH = "data_snapshot.{topic}.bin"
+    MAGIC = b"GEOTRIV2"
+    VERSION = 3
+    HEADER_SIZE = struct.Struct("<I")
+
+    def __init__(self, topic, path=None) -> None:
+        self.topic = topic
+        self.path = path or self.PATH.format(topic=topic)
+
+    def file_hash(self, filepath):
+        '''Returns the sha256 hex digest of the file at filepath.'''
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def read_header(self, mm):
+        '''Validates the magic bytes and returns the decoded header dictionary, or None if the file is not a snapshot this version can read.'''
+        if mm[:len(self.MAGIC)] != self.MAGIC:
+            return None
+        start = len(self.MAGIC) + self.HEADER_SIZE.size
+        (header_length,) = self.HEADER_SIZE.unpack_from(mm, len(self.MAGIC))
+        with memoryview(mm)[start:start+header_length] as view:
+            header = marshal.loads(view)
+        if header.get('version') != self.VERSION:
+            return None
+        header['data_start'] = start + header_length
+        return header
+
+    def is_fresh(self, header, data):
+        '''Compares the source file recorded in the header with the one on disk. If its mtime and size are unchanged it is trusted; otherwise the contents are hashed, so a touched but unchanged file does not force a rebuild.'''
+        if header['topic'] != self.topic or header['excluded'] != tuple(sorted(data.EXCLUDED_COUNTRIES)) or header['junk'] != tuple(sorted(data.JUNK_ITEMS)):
+            return False
+        filepath = data.get_filepath(self.topic)
+        stat = os.stat(filepath)
+        recorded_mtime, recorded_size, recorded_sha = header['source']
+        if (stat.st_mtime_ns, stat.st_size) == (recorded_mtime, recorded_size):
+            return True
+        return stat.st_size == recorded_size and self.file_hash(filepath) == recorded_sha
+
+    def load(self, data):
+        '''Returns the (items, countries, report) section saved for this topic, or None if the snapshot is missing, unreadable or stale.'''
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return None
+        with f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                return None
+            with mm:
+                try:
+                    header = self.read_header(mm)
+                    if header is None or not self.is_fresh(header, data):
+                        return None
+                    with memoryview(mm)[header['data_start']:] as view:
+                        items, countries, report = marshal.loads(view)
+                except (EOFError, ValueError, TypeError, KeyError, struct.error, OSError):
+                    return None
+        return (items, countries, report)
+
+    def save(self, data, section):
+        '''Writes an (items, countries, report) section built from this topic to the snapshot file, replacing it atomically.'''
+        filepath = data.get_filepath(self.topic)
+        stat = os.stat(filepath)
+        header = marshal.dumps({
+            'version': self.VERSION,
+            'topic': self.topic,
+            'source': (stat.st_mtime_ns, stat.st_size, self.file_hash(filepath)),
+            'excluded': tuple(sorted(data.EXCLUDED_COUNTRIES)),
+            'junk': tuple(sorted(data.JUNK_ITEMS))
+        })
+        payload = marshal.dumps(section)
+        try:
+            with atomic_write(self.path) as f:
+                f.write(self.MAGIC)
+                f.write(self.HEADER_SIZE.pack(len(header)))
+                f.write(header)
+                f.write(payload)
+        except OSError:
+            # a read-only working directory just means every start is a cold start
+            return False
+        return True
@@ -0,0 +1,89 @@
+import json
+import time
+import threading
+
+
+class GenerationStats:
+    '''Collects how much work question generation does for each region and category: how many candidates were rejected and why, and how long each stage of Question.__init__ takes. Disabled by default; while disabled, Question only pays for a single attribute check.'''
+    # candidates drawn and then thrown away; countries and items the indexes leave out up front cost nothing and aren't counted
+    REJECTIONS = ("used country", "used item", "few distractors")
+    STAGES = ("format", "answer pair", "text", "distractors")
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.dump_thread = None
+        self.dump_stop = threading.Event()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+
+    def record(self, region, category, rejections, stage_seconds):
+        '''Adds the rejections and stage timings of one generated question to the totals for its region and category.'''
+        with self.lock:
+            counter = self.counters.get((region, category))
+            if counter is None:
+                counter = self.counters[(region, category)] = {
+                    'questions': 0,
+                    'retries': 0,
+                    'rejections': dict.fromkeys(self.REJECTIONS, 0),
+                    'stage_seconds': dict.fromkeys(self.STAGES, 0.0)
+                }
+            counter['questions'] += 1
+            for reason, count in rejections.items():
+                counter['rejections'][reason] += count
+                counter['retries'] += count
+            for stage, seconds in stage_seconds.items():
+                counter['stage_seconds'][stage] += seconds
+
+    def snapshot(self):
+        '''Returns a copy of the counters that can be serialized as JSON, keyed by "region / category", with per-question averages added.'''
+        with self.lock:
+            snapshot = {}
+            for (region, category), counter in self.counters.items():
+                entry = {
+                    'questions': counter['questions'],
+                    'retries': counter['retries'],
+                    'rejections': dict(counter['rejections']),
+                    'stage_seconds': dict(counter['stage_seconds'])
+                }
+                questions = counter['questions'] or 1
+                entry['retries_per_question'] = counter['retries'] / questions
+                entry['stage_us_per_question'] = {
+                    stage: seconds / questions * 1e6 for stage, seconds in counter['stage_seconds'].items()}
+                snapshot[f"{region} / {category}"] = entry
+        return snapshot
+
+    def dump(self, path):
+        '''Writes a snapshot to path as JSON.'''
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'time': time.time(), 'stats': self.snapshot()}, f, indent=2)
+
+    def start_periodic_dump(self, path, interval=60):
+        '''Enables collection and writes a snapshot to path every interval seconds on a background thread, until stop_periodic_dump is called.'''
+        self.enable()
+        self.dump_stop.clear()
+
+        def run():
+            while not self.dump_stop.wait(interval):
+                self.dump(path)
+        self.dump_thread = threading.Thread(target=run, daemon=True)
+        self.dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self.dump_thread:
+            self.dump_stop.set()
+            self.dump_thread.join()
+            self.dump_thread = None
+
+
+# shared by every Question in the process
+STATS = GenerationStats()
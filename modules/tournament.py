@@ -0,0 +1,106 @@
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+from modules.question import Session, Question, Feedback, MultipleChoice
+
+# One question of a Round, generated once and shared read-only by every player. choices is a tuple of (letter, choice) pairs in display order, wrong_countries maps each wrong letter to its country for DifficultyStats, and prompt and the feedback statements are rendered up front.
+RoundQuestion = namedtuple("RoundQuestion", (
+    "number", "category", "format", "answer_pair", "question_text", "correct_choice", "choices", "wrong_countries",
+    "prompt", "looking_for", "correct_items_statement"))
+
+
+def round_question(question):
+    '''Returns the RoundQuestion for a generated Question.'''
+    feedback = Feedback(question)
+    return RoundQuestion(
+        question.number, question.category, question.format,
+        MappingProxyType(dict(question.answer_pair)), question.question_text, question.correct_choice,
+        tuple(question.get_choices().items()), MappingProxyType(dict(question.wrong_countries)), question.prompt_text(),
+        feedback.looking_for, feedback.correct_items_statement)
+
+
+class PlayedQuestion(MultipleChoice):
+    '''One player's answer to a RoundQuestion. Offers the parts of Question and Feedback that games use, reading everything else from the shared question, so playing a round creates nothing per player but the answer.'''
+    __slots__ = ("game", "shared", "user_choice", "answered_correctly")
+    user_text = None   # rounds are played multiple choice
+
+    def __init__(self, game, shared) -> None:
+        self.game = game
+        self.shared = shared
+        self.user_choice = None
+        self.answered_correctly = None
+
+    def __getattr__(self, name):
+        # number, category, format, answer_pair, question_text, correct_choice and the feedback statements
+        return getattr(self.shared, name)
+
+    @property
+    def feedback(self):
+        # the statements Feedback would render are on the shared question already
+        return self
+
+    @property
+    def you_said(self):
+        if self.user_choice is None:
+            return None
+        return f"You said {dict(self.shared.choices)[self.user_choice]}"
+
+    def get_choices(self):
+        return dict(self.shared.choices)
+
+    def prompt_text(self):
+        return self.shared.prompt
+
+
+class Round:
+    '''A tournament round: one set of questions for a region and categories, generated once and played by any number of games, which all get the same answer pairs, choices and letters. Games join the round, play it as usual, and their scores are written in a single batch by finish.'''
+
+    def __init__(self, region, categories, questions) -> None:
+        self.region = region
+        self.categories = categories
+        self.questions = tuple(questions)
+        self.games = []
+        self.finished = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def generate(cls, data, region, categories, count=10, seed=None):
+        '''Generates a round of count questions. Raises InsufficientDataError if the data can't supply them.'''
+        session = Session(data, region, categories, seed)
+        questions = []
+        for _ in range(count):
+            question = Question(session)
+            session.mark_used(question)
+            session.question_counter += 1
+            questions.append(round_question(question))
+        return cls(region, categories, questions)
+
+    def join(self, game):
+        '''Sets up a new game to play this round: its region, categories and length come from the round, and its questions from Game.next_question.'''
+        with self.lock:
+            if self.finished:
+                raise ValueError("This round has finished.")
+            game.region = self.region
+            game.categories = self.categories
+            game.QUESTION_LIMIT = len(self.questions)
+            game.free_text = False
+            game.round = self
+            self.games.append(game)
+        return game
+
+    def play_question(self, game):
+        '''Returns the game's next question of the round.'''
+        return PlayedQuestion(game, self.questions[game.question_counter - 1])
+
+    def results(self):
+        '''Returns a list of (username, score) tuples for every game in the round, best first.'''
+        return sorted(((game.username, game.score) for game in self.games), key=lambda result: -result[1])
+
+    def finish(self, score_store, played_at=None):
+        '''Ends the round and records every game that answered all its questions in score_store, in one transaction. Games still being played are left out rather than recorded with a partial score. Returns the number of games recorded.'''
+        with self.lock:
+            self.finished = True
+            games = [game for game in self.games if game.game_over()]
+        score_store.add_games(
+            (game.username, self.region, self.categories, game.score, played_at) for game in games)
+        return len(games)
@@ -0,0 +1,100 @@
+'''Builds a question bank for every region and topic on a pool of worker processes, streaming the questions to a JSONL file. Usage: python pregenerate.py --count 10000 --output question_bank.jsonl'''
+import sys
+import json
+import hashlib
+import argparse
+import multiprocessing
+from main import Game
+from modules.data import Data, InsufficientDataError
+from modules.question import generate_questions
+from modules.shared import SharedData
+from modules.bank import QuestionBank
+
+data = None   # each worker process loads its own Data once, see load_data
+
+
+def load_data(shared_path=None):
+    '''Pool initializer, runs once in each worker process. With shared_path the worker attaches to the dataset the parent published instead of loading its own.'''
+    global data
+    data = SharedData.attach(shared_path) if shared_path else Data()
+
+
+def shard_seed(seed, region, topic, shard):
+    '''Derives a stable seed for one shard from the base seed, so every shard is reproducible on its own no matter which worker runs it.'''
+    key = f"{seed}:{region}:{topic}:{shard}".encode('utf-8')
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], 'big')
+
+
+def generate_shard(task):
+    '''Generates one shard of questions and returns it as JSONL text, or an error message if the region and topic have too little data.'''
+    region, topic, shard, count, seed = task
+    categories = Game.QUESTION_FORMATS[topic]
+    lines = []
+    try:
+        for record in generate_questions(data, region, categories, count, shard_seed(seed, region, topic, shard), Game.QUESTION_LIMIT):
+            record['topic'] = topic
+            record['shard'] = shard
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+    except InsufficientDataError as error:
+        return (task, "", str(error))
+    return (task, "".join(lines), None)
+
+
+def make_tasks(regions, count, shard_size, seed):
+    '''Splits count questions for each region and topic into shards of at most shard_size questions.'''
+    for region in regions:
+        for topic in Game.QUESTION_FORMATS:
+            for shard, start in enumerate(range(0, count, shard_size)):
+                yield (region, topic, shard, min(shard_size, count - start), seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pregenerate a question bank for every region and topic.")
+    parser.add_argument("--count", type=int, default=1000,
+                        help="questions per region and topic (default 1000)")
+    parser.add_argument("--shard-size", type=int, default=500,
+                        help="questions generated per task (default 500)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="base seed; the same seed gives byte-identical output")
+    parser.add_argument("--output", default="question_bank.jsonl",
+                        help="JSONL file to write (default question_bank.jsonl)")
+    parser.add_argument("--bank", default=None,
+                        help="also write the questions to this memory-mapped question bank file")
+    parser.add_argument("--shared", action="store_true",
+                        help="load the data once and share it with the workers through memory-mapped pages")
+    args = parser.parse_args()
+
+    parent_data = Data()
+    regions = list(parent_data.countries['major region'].keys())
+    tasks = make_tasks(regions, args.count, args.shard_size, args.seed)
+    skipped = set()
+    written = 0
+    shared = SharedData.publish(parent_data) if args.shared else None
+    initargs = (shared.path,) if shared else ()
+    try:
+        with multiprocessing.Pool(args.workers, initializer=load_data, initargs=initargs) as pool, open(args.output, "w", encoding="utf-8") as f:
+            # imap hands back shards in task order, so the file is the same regardless of which worker finishes first
+            for (region, topic, shard, count, seed), text, error in pool.imap(generate_shard, tasks):
+                if error:
+                    if (region, topic) not in skipped:
+                        print(f"Skipping {region} / {topic}: {error}", file=sys.stderr)
+                        skipped.add((region, topic))
+                    continue
+                f.write(text)
+                written += count
+    finally:
+        if shared:
+            shared.unlink()
+    print(f"Wrote {written} questions to {args.output}")
+    if args.bank:
+        with open(args.output, encoding="utf-8") as f:
+            bank = QuestionBank.write(args.bank, (json.loads(line) for line in f))
+        print(f"Wrote {bank.count} questions to {args.bank}")
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+'''Hosts many trivia games at once over a line-based TCP protocol, all sharing a single Data instance. Usage: python server.py [--host HOST] [--port PORT]
+
+The server sends plain text lines. A line starting with "> " is a prompt: it is followed by the kind of answer expected (name, menu, answer, text, report, enter or again) and the prompt text, and the server then waits for one line from the client. See client.py for a client.'''
+import asyncio
+import argparse
+import concurrent.futures
+from main import Game
+from modules.data import Data, DataReloader, InsufficientDataError
+from modules.scores import Scores, ScoreStore
+from modules.difficulty import DifficultyStats
+
+PROMPT = "> "
+
+
+class Connection:
+    '''Plays trivia with one client, taking the same steps as main() but reading and writing through the connection instead of input and print.'''
+
+    def __init__(self, server, reader, writer) -> None:
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, text=""):
+        self.writer.write((text + "\n").encode("utf-8"))
+        await self.writer.drain()
+
+    async def ask(self, kind, prompt):
+        '''Sends a prompt and returns the next line from the client.'''
+        await self.send(f"{PROMPT}{kind} {prompt}")
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionResetError("client disconnected")
+        return line.decode("utf-8", errors="replace").strip()
+
+    async def option_menu(self, game, options):
+        await self.send(game.menu_text(options))
+        while True:
+            answer = game.parse_option(options, await self.ask("menu", "Your choice?"))
+            if answer is None:
+                await self.send("Please enter a valid digit.")
+            else:
+                return answer
+
+    async def start_game(self, game):
+        while True:
+            game.username = await self.ask("name", "Who's playing [type your name]?")
+            error = game.check_username(game.username)
+            if not error:
+                break
+            await self.send(error)
+        while True:
+            await self.send("Choose the region you will play. \n")
+            game.region = await self.option_menu(game, game.region_options())
+            await self.send("Choose the topics you will play. \n")
+            game.categories = game.QUESTION_FORMATS[await self.option_menu(game, game.topic_options())]
+            error = game.check_selection()
+            if not error:
+                break
+            await self.send(error)
+        await self.send("Choose how you will answer. \n")
+        game.free_text = game.ANSWER_MODES[await self.option_menu(game, game.answer_mode_options())]
+
+    async def ask_question(self, game, question):
+        await self.send(question.prompt_text())
+        if game.free_text:
+            await self.send(question.answer_text(await self.ask("text", "Your answer?")))
+            return
+        while True:
+            user_choice = (await self.ask("answer", "Your answer?")).upper()
+            if user_choice in game.LETTERS:
+                break
+            await self.send("Invalid input, try again!\n")
+        await self.send(question.answer(user_choice))
+
+    async def final_report(self, game):
+        await self.send(game.correct_report())
+        await self.ask("enter", "Press Enter to review incorrect answers")
+        await self.send(game.incorrect_report())
+
+    async def report_scores(self, game):
+        '''Score records are read and written on the server's score thread, so the database never holds up other games.'''
+        def record():
+            scores = Scores(game, self.server.score_store)
+            scores.update_records()
+            return scores
+        scores = await self.server.run_scores(record)
+        await self.send(f"\nYou scored {scores.score} points this round, playing the {scores.region} region and {scores.topic} category.")
+        rank = await self.server.run_scores(self.server.score_store.user_rank, game.username, game.region, game.categories)
+        if rank:
+            await self.send(f"You are ranked {rank[0]} of {rank[1]} players for this region and topic.")
+
+    async def run(self):
+        '''Plays games with the client until it quits or disconnects.'''
+        await self.send("\nWorld Geography Trivia Game \n")
+        settings = None
+        while True:
+            # the game keeps this version of the data even if a reload happens while it's played
+            game = Game(self.server.data)
+            if settings:
+                game.username, game.region, game.categories, game.free_text = settings
+            else:
+                await self.start_game(game)
+            game.seen = await self.server.run_scores(self.server.score_store.load_seen, game.username)
+            game.difficulty = self.server.difficulty
+            game.target_difficulty = self.server.target_difficulty
+            try:
+                while not game.game_over():
+                    question = game.next_question()
+                    await self.ask_question(game, question)
+                    game.record_answer(question)
+            except InsufficientDataError as error:
+                # end the game early rather than the connection
+                await self.send(f"\n{error} The game ends here.")
+            self.server.games_served += 1
+            report_choice = await self.ask("report", "See detailed report? Enter S to skip, anything else to continue:")
+            if report_choice.lower() != "s":
+                await self.final_report(game)
+            await self.report_scores(game)
+            while True:
+                end_choice = (await self.ask("again", "Play again as [s]ame user and settings, [d]ifferent user / settings, or [q]uit game?")).lower()
+                if end_choice in ("s", "d", "q"):
+                    break
+            if end_choice == "q":
+                return
+            settings = (game.username, game.region, game.categories, game.free_text) if end_choice == "s" else None
+
+
+class GameServer:
+    '''Accepts connections and runs a Connection for each one on the same event loop. Every game shares the server's Data, which is only read after loading. If a DataReloader is given instead of a Data object, new games use its current version. Every answer is recorded in the server's DifficultyStats, and with a target_difficulty games pick questions that are missed about that share of the time.'''
+
+    def __init__(self, data, score_store, target_difficulty=None) -> None:
+        self.data_source = data
+        self.score_store = score_store
+        self.difficulty = DifficultyStats()
+        self.target_difficulty = target_difficulty
+        # a single thread keeps the score database's transactions from interleaving
+        self.score_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.connections = 0
+        self.games_served = 0
+
+    @property
+    def data(self):
+        if isinstance(self.data_source, DataReloader):
+            return self.data_source.current
+        return self.data_source
+
+    async def run_scores(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.score_executor, function, *args)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            await Connection(self, reader, writer).run()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8023):
+        # a large listen backlog absorbs bursts of new connections
+        return await asyncio.start_server(self.handle, host, port, backlog=4096)
+
+    def close(self):
+        self.score_executor.shutdown()
+
+
+async def serve(host, port, reload_interval, target_difficulty=None):
+    if reload_interval:
+        # pick up changes to the country-json files without a restart
+        data = DataReloader(reload_interval).start()
+    else:
+        data = Data()
+    server = GameServer(data, ScoreStore(), target_difficulty)
+    listener = await server.start(host, port)
+    print(f"Serving trivia on {host}:{port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+        if reload_interval:
+            data.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host trivia games over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--reload-interval", type=float, default=5,
+                        help="seconds between checks for changed data files, 0 to disable (default 5)")
+    parser.add_argument("--target-difficulty", type=float, default=None,
+                        help="pick questions players miss about this share of the time, from 0 to 1 (default: any)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.reload_interval, args.target_difficulty))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()